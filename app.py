@@ -9,20 +9,97 @@ handler.setLevel(logging.DEBUG)
 logger.addHandler(handler)
 
 
-def app_text():
+def app_text(ansi=None, instrument=False):
     from thekingsescape.text_app.controller import TextController
     from thekingsescape.text_app.view import TextView
 
     controller = TextController(stdout)
-    v = TextView(stdout)
+    v = TextView(stdout, ansi)
     controller.registerView(v)
 
+    from thekingsescape.instrumentation import instrumentation
+    if(instrument):
+        instrumentation.enable()
     controller.start()
+    if(instrument):
+        logger.info("Instrumentation:\n%s", instrumentation.report())
 
 
-def app_web():
+def app_selfplay(games=100, output="selfplay.jsonl", workers=None):
+    from thekingsescape.ai.randomplayer import RandomPlayer
+    from thekingsescape.selfplay import selfPlay
+
+    policy = (RandomPlayer, {})
+    with open(output, "w") as stream:
+        summary = selfPlay(games, policy, policy, stream, workers)
+    logger.info("Played %d games (%d moves) in %.1fs: "
+                "%.2f games/s, %.0f moves/s, results %r",
+                summary["games"], summary["moves"], summary["seconds"],
+                summary["gamesPerSecond"], summary["movesPerSecond"],
+                summary["statuses"])
+
+
+def app_import(path, output="import.jsonl", workers=None):
+    from thekingsescape.text_app.bulkimport import importGames
+
+    with open(path) as stream, open(output, "w") as results:
+        summary = importGames(stream, results, workers)
+    logger.info("Verified %d games (%d moves) in %.1fs: %.0f games/s, "
+                "%d with errors", summary["games"], summary["moves"],
+                summary["seconds"], summary["gamesPerSecond"],
+                summary["errors"])
+
+
+def app_tablebase(size=11, attackers=2, defenders=0, directory="tablebase",
+                  workers=None):
+    import os
+    import time
+    from thekingsescape.ai.tablebase import Tablebase
+    from thekingsescape.game.game import Game
+
+    if(size not in Game.SIZES):
+        raise ValueError("Games are only played on %s boards, a %dx%d "
+                         "tablebase would never be probed" %
+                         (", ".join("%dx%d" % (s, s) for s in Game.SIZES),
+                          size, size))
+    os.makedirs(directory, exist_ok=True)
+    start = time.monotonic()
+    Tablebase(directory).generate(size, attackers, defenders,
+                                  workers or os.cpu_count())
+    logger.info("Generated tablebase %dx%d with %d attackers and "
+                "%d defenders in %.1fs", size, size, attackers, defenders,
+                time.monotonic() - start)
+
+
+def app_perft(depth=2, output="perft.json", reference=None):
+    import json
+    from thekingsescape.perft import compareResults, runSuite, writeResults
+
+    results = runSuite(depth=depth)
+    if(reference is not None):
+        with open(reference) as stream:
+            results["mismatches"].extend(
+                compareResults(results, json.load(stream)))
+    with open(output, "w") as stream:
+        writeResults(results, stream)
+    for (name, engine) in sorted(results["engines"].items()):
+        run = engine["perft"][str(depth)]
+        logger.info("%s: perft(%d) = %d nodes, %.0f nodes/s, "
+                    "%d bytes per game", name, depth, run["nodes"],
+                    run["nodesPerSecond"], engine["footprint"])
+    for mismatch in results["mismatches"]:
+        logger.error("Node count mismatch: %s", mismatch)
+
+
+def app_web(instrument=False):
     from thekingsescape.webcontroller import WebController
-    wc = WebController()
+    wc = WebController(instrument=instrument)
+    wc.start()
+
+
+def app_websocket(instrument=False):
+    from thekingsescape.asyncwebcontroller import AsyncWebController
+    wc = AsyncWebController(instrument=instrument)
     wc.start()
 
 
@@ -0,0 +1,24 @@
+import pytest
+from thekingsescape.game.cell import Cell, CellType
+from thekingsescape.game.game import Game
+from thekingsescape.game.pawn import Attacker, Defender, King
+from thekingsescape.game.player import Player
+from thekingsescape.perft import gameFootprint
+
+# About 18 kB with slotted cells and pawns, 47 kB without slots.
+FOOTPRINT_BUDGET = 24 * 1024
+
+
+def test_game_footprint_within_budget():
+    game = Game(Player("Attacker"), Player("Defender"), 11)
+    assert gameFootprint(game) < FOOTPRINT_BUDGET
+
+
+@pytest.mark.parametrize("obj", [
+    Cell(CellType.NORMAL),
+    Attacker(None),
+    Defender(None),
+    King(None),
+], ids=lambda obj: type(obj).__name__)
+def test_board_objects_have_no_dict(obj):
+    assert not hasattr(obj, "__dict__")
@@ -0,0 +1,14 @@
+from thekingsescape.perft import runSuite
+
+# Starting position of the 11x11 board, attacker to move:
+# depth -> (nodes, captures), checked by brute force on Game.
+START_COUNTS = {1: (116, 0), 2: (6788, 1800)}
+
+
+def test_engines_agree_and_match_start_counts():
+    results = runSuite(depth=2, corpusSize=5)
+    assert results["mismatches"] == []
+    for (name, engine) in results["engines"].items():
+        for (depth, expected) in START_COUNTS.items():
+            run = engine["perft"][str(depth)]
+            assert (run["nodes"], run["captures"]) == expected, name
@@ -0,0 +1,51 @@
+import pytest
+from thekingsescape.game.bitboard import BitboardGame
+from thekingsescape.game.game import Game, GameStatus
+from thekingsescape.game.pawn import Attacker, Defender
+from thekingsescape.game.player import Player
+
+# The king and its only defender are walled in by attackers,
+# without the king being captured: the defender cannot move.
+# (2, 4) is a free attacker.
+ATTACKERS = [(5, 6), (7, 6), (6, 5), (5, 7), (7, 7), (6, 8), (2, 4)]
+DEFENDERS = [(6, 7)]
+
+
+def _stuckGame(attackerToMove):
+    game = Game(Player("Attacker"), Player("Defender"))
+    for row in game.cells:
+        for cell in row:
+            if(cell.isOccupied() and cell.pawn is not game.king):
+                cell.takePawn()
+    for position in ATTACKERS:
+        game.getCell(*position).placePawn(Attacker(game.attackingPlayer))
+    for position in DEFENDERS:
+        game.getCell(*position).placePawn(Defender(game.defendingPlayer))
+    game.refreshState(attackerToMove)
+    return game
+
+
+@pytest.mark.parametrize("attackerToMove, status", [
+    (True, GameStatus.IN_PROGRESS),
+    (False, GameStatus.ATTACKER_WON),
+])
+def test_side_without_moves_loses(attackerToMove, status):
+    game = _stuckGame(attackerToMove)
+    assert game.getStatus() is status
+    board = BitboardGame.fromGame(game)
+    assert board.getStatus() is status
+    assert board.getStatus(attackerToMove) is status
+    assert board.toGame().getStatus() is status
+
+
+def test_status_follows_execute_and_undo():
+    game = _stuckGame(True)
+    (start, end) = (game.getCell(2, 4), game.getCell(2, 5))
+    move = [m for m in game.legalMoves(game.attackingPlayer)
+            if(m.startCell is start and m.endCell is end)][0]
+    game.execute(move)
+    assert game.playerToMove() is game.defendingPlayer
+    assert game.getStatus() is GameStatus.ATTACKER_WON
+    game.undo()
+    assert game.playerToMove() is game.attackingPlayer
+    assert game.getStatus() is GameStatus.IN_PROGRESS
@@ -0,0 +1,59 @@
+import random
+import pytest
+from thekingsescape.game.bitboard import BitboardGame
+from thekingsescape.game.game import Game
+from thekingsescape.game.move import Legality, Move
+from thekingsescape.game.player import Player
+
+
+def _positions(seed, plies=80):
+    "Yields the games of a random playout, after each move"
+    attacker = Player("Attacker")
+    defender = Player("Defender")
+    game = Game(attacker, defender)
+    rng = random.Random(seed)
+    for ply in range(plies):
+        if(game.isOver()):
+            break
+        yield (game, rng)
+        player = (attacker, defender)[ply % 2]
+        game.execute(rng.choice(list(game.legalMoves(player))))
+
+
+def _candidates(game, rng, player, count=200):
+    "Returns random (mostly illegal) moves and all the legal ones"
+    limit = game.width + 2
+    players = (game.attackingPlayer, game.defendingPlayer)
+    moves = [Move(game.getCell(rng.randrange(limit), rng.randrange(limit)),
+                  game.getCell(rng.randrange(limit), rng.randrange(limit)),
+                  game, rng.choice(players))
+             for _ in range(count)]
+    moves.extend(game.legalMoves(player))
+    return moves
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_validate_many_matches_validate(seed):
+    for (game, rng) in _positions(seed):
+        player = (game.attackingPlayer,
+                  game.defendingPlayer)[len(game.history) % 2]
+        moves = _candidates(game, rng, player)
+        assert game.validate_many(moves) == [m.validate() for m in moves]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_messages_match_bitboard(seed):
+    for (game, rng) in _positions(seed):
+        player = (game.attackingPlayer,
+                  game.defendingPlayer)[len(game.history) % 2]
+        board = BitboardGame.fromGame(game)
+        index = board.tables.index
+        for move in _candidates(game, rng, player):
+            legality = move.validate()
+            reason = board._whyNotLegal(index(*move.startCell.position),
+                                        index(*move.endCell.position),
+                                        move.player)
+            if(legality is Legality.LEGAL):
+                assert reason is None
+            else:
+                assert move.describe(legality) == reason
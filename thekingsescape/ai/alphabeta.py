@@ -0,0 +1,257 @@
+import time
+from ..game.cell import CellType
+from ..game.game import GameStatus
+from ..game.player import ComputerPlayer
+from .transposition import Bound, TranspositionTable
+
+WIN = 100000
+INFINITY = 10 * WIN
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time budget is exhausted."""
+    pass
+
+
+class AlphaBetaPlayer(ComputerPlayer):
+    """Computer player searching with iterative-deepening alpha-beta.
+
+    The search deepens one ply at a time until the time budget (in seconds)
+    of the move is spent or maxDepth is reached, and plays the best move of
+    the deepest completed iteration.
+    Moves are ordered with the best move found in the transposition table
+    first, then king escapes, captures, and king moves to the border.
+
+    The search explores lines with game.execute() and game.undo() on the
+    game it is given, which is left in its original position.
+
+    Statistics about the last search are kept in the attributes
+    depthReached and nodes.
+    Moves from the opening book or the endgame tablebase, if given,
+    are played without search.
+    """
+
+    ATTACKER_VALUE = 100
+    DEFENDER_VALUE = 200
+    KING_BLOCK_VALUE = 60
+    KING_DISTANCE_VALUE = 15
+
+    def __init__(self, name, timeBudget=1.0, maxDepth=32, tableSize=2 ** 16,
+                 book=None, tablebase=None):
+        super().__init__(name, book, tablebase)
+        self.timeBudget = timeBudget
+        self.maxDepth = maxDepth
+        self.table = TranspositionTable(tableSize)
+        self.depthReached = 0
+        self.nodes = 0
+        self._deadline = None
+
+    def chooseMove(self, game):
+        """Returns the best move found for this player within the
+        time budget, or None if the player cannot move."""
+        bookMove = self.bookMove(game)
+        if(bookMove is not None):
+            self.depthReached = 0
+            self.nodes = 0
+            return bookMove
+        self._deadline = time.monotonic() + self.timeBudget
+        self.table.newSearch()
+        self.nodes = 0
+        self.depthReached = 0
+        opponent = self._opponent(game, self)
+        moves = self._orderedMoves(game, self, None)
+        if(not moves):
+            return None
+        bestMove = moves[0]
+        rootHistory = len(game.history)
+        for depth in range(1, self.maxDepth + 1):
+            try:
+                (value, move) = self._searchRoot(game, moves, depth, opponent)
+            except SearchTimeout:
+                while(len(game.history) > rootHistory):
+                    game.undo()
+                break
+            bestMove = move
+            self.depthReached = depth
+            moves.remove(move)
+            moves.insert(0, move)
+            if(abs(value) >= WIN - self.maxDepth):
+                break
+        return bestMove
+
+    def _searchRoot(self, game, moves, depth, opponent):
+        alpha = -INFINITY
+        bestMove = moves[0]
+        for move in moves:
+            game.execute(move)
+            value = -self._search(game, depth - 1, -INFINITY, -alpha, 1,
+                                  opponent, self)
+            game.undo()
+            if(value > alpha):
+                alpha = value
+                bestMove = move
+        self.table.store(game.hash, depth, alpha, Bound.EXACT,
+                         _moveKey(bestMove))
+        return (alpha, bestMove)
+
+    def _search(self, game, depth, alpha, beta, ply, player, opponent):
+        """Negamax alpha-beta search.
+        Returns the value of the position for the player to move."""
+        self.nodes += 1
+        if(not self.nodes & 255 and time.monotonic() > self._deadline):
+            raise SearchTimeout()
+        status = game.getStatus()
+        if(status != GameStatus.IN_PROGRESS):
+            return self._terminalValue(game, status, player, ply)
+        if(depth <= 0):
+            return self.evaluate(game, player)
+
+        originalAlpha = alpha
+        bestKey = None
+        entry = self.table.probe(game.hash)
+        if(entry is not None):
+            (_, entryDepth, value, bound, bestKey, _) = entry
+            if(entryDepth >= depth):
+                value = _valueFromTable(value, ply)
+                if(bound == Bound.EXACT):
+                    return value
+                if(bound == Bound.LOWER):
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if(alpha >= beta):
+                    return value
+
+        moves = self._orderedMoves(game, player, bestKey)
+        best = -INFINITY
+        bestMove = None
+        for move in moves:
+            game.execute(move)
+            value = -self._search(game, depth - 1, -beta, -alpha, ply + 1,
+                                  opponent, player)
+            game.undo()
+            if(value > best):
+                best = value
+                bestMove = move
+            if(best > alpha):
+                alpha = best
+            if(alpha >= beta):
+                break
+
+        if(best <= originalAlpha):
+            bound = Bound.UPPER
+        elif(best >= beta):
+            bound = Bound.LOWER
+        else:
+            bound = Bound.EXACT
+        self.table.store(game.hash, depth, _valueToTable(best, ply), bound,
+                         _moveKey(bestMove))
+        return best
+
+    def _terminalValue(self, game, status, player, ply):
+        if(status == GameStatus.DRAW):
+            return 0
+        if(status == GameStatus.ATTACKER_WON):
+            winner = game.attackingPlayer
+        else:
+            winner = game.defendingPlayer
+        if(winner == player):
+            return WIN - ply
+        return -(WIN - ply)
+
+    def evaluate(self, game, player):
+        """Static evaluation of the position
+        from the point of view of the given player."""
+        attackers = 0
+        defenders = 0
+        for row in game.cells:
+            for cell in row:
+                pawn = cell.pawn
+                if(pawn is None or pawn is game.king):
+                    continue
+                if(pawn.owner == game.attackingPlayer):
+                    attackers += 1
+                else:
+                    defenders += 1
+        kingCell = game.king.cell
+        (row, col) = kingCell.position
+        n = game.width
+        blocked = sum(1 for cell in game.getNeighbouringCells(kingCell)
+                      if cell.isBlockingTo(game.king))
+        distance = min(row - 1, n - row) + min(col - 1, n - col)
+        score = (self.ATTACKER_VALUE * attackers -
+                 self.DEFENDER_VALUE * defenders +
+                 self.KING_BLOCK_VALUE * blocked +
+                 self.KING_DISTANCE_VALUE * distance)
+        if(player == game.defendingPlayer):
+            return -score
+        return score
+
+    def _orderedMoves(self, game, player, bestKey):
+        """Returns the legal moves of the player, most promising first:
+        table move, king escapes, captures, king moves to the border,
+        then all other moves."""
+        n = game.width
+        scored = []
+        for move in game.legalMoves(player):
+            pawn = move.startCell.pawn
+            if(_moveKey(move) == bestKey):
+                score = 4
+            elif(pawn is game.king and
+                 move.endCell.type == CellType.CASTLE):
+                score = 3
+            elif(_isCapture(game, move, pawn)):
+                score = 2
+            elif(pawn is game.king and
+                 (move.endCell.position[0] in [1, n] or
+                  move.endCell.position[1] in [1, n])):
+                score = 1
+            else:
+                score = 0
+            scored.append((score, move))
+        scored.sort(key=lambda pair: pair[0], reverse=True)
+        return [move for (_, move) in scored]
+
+    @staticmethod
+    def _opponent(game, player):
+        if(player == game.attackingPlayer):
+            return game.defendingPlayer
+        return game.attackingPlayer
+
+
+def _moveKey(move):
+    if(move is None):
+        return None
+    return (move.startCell.position, move.endCell.position)
+
+
+def _isCapture(game, move, pawn):
+    """Returns True if the move would take at least one pawn,
+    using the same sandwich rule as Game.isTakenBy."""
+    (row, col) = move.endCell.position
+    for (dr, dc) in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
+        victimCell = game.cells[row + dr][col + dc]
+        victim = victimCell.pawn
+        if(victim is None or victim is game.king or
+           victim.owner == pawn.owner):
+            continue
+        if(game.cells[row + 2 * dr][col + 2 * dc].isBlockingTo(victim)):
+            return True
+    return False
+
+
+def _valueToTable(value, ply):
+    "Stores win values relative to the current node rather than the root"
+    if(value >= WIN - 1000):
+        return value + ply
+    if(value <= -(WIN - 1000)):
+        return value - ply
+    return value
+
+
+def _valueFromTable(value, ply):
+    if(value >= WIN - 1000):
+        return value - ply
+    if(value <= -(WIN - 1000)):
+        return value + ply
+    return value
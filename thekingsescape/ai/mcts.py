@@ -0,0 +1,182 @@
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from ..game.bitboard import BitboardGame
+from ..game.game import GameStatus
+from ..game.player import ComputerPlayer
+
+
+class MCTSPlayer(ComputerPlayer):
+    """Computer player using Monte Carlo Tree Search (UCT).
+
+    The search is parallelized at the root: each worker process grows its
+    own tree from the current position for the time budget (in seconds),
+    and the visit counts of the root moves are summed over all trees.
+    The most visited move is played.
+
+    Workers only receive the compact BitboardGame position (a few integers)
+    and play on bitboards, so the Game/Cell/Pawn graph is never pickled.
+    With workers=1 the search runs in the calling process.
+
+    Playouts are random games, stopped as a draw after maxPlayoutLength
+    moves. Statistics about the last search are kept in the attributes
+    playouts and playoutsPerSecond.
+    Moves from the opening book or the endgame tablebase, if given,
+    are played without search.
+    Call close() to shut down the worker processes.
+    """
+
+    def __init__(self, name, timeBudget=1.0, workers=None,
+                 exploration=1.4, maxPlayoutLength=200, seed=None, book=None,
+                 tablebase=None):
+        super().__init__(name, book, tablebase)
+        self.timeBudget = timeBudget
+        self.workers = workers if workers is not None else os.cpu_count()
+        self.exploration = exploration
+        self.maxPlayoutLength = maxPlayoutLength
+        self.random = random.Random(seed)
+        self.playouts = 0
+        self.playoutsPerSecond = 0.0
+        self._executor = None
+
+    def chooseMove(self, game):
+        """Returns the most visited root move after searching for the
+        time budget, or None if the player cannot move."""
+        bookMove = self.bookMove(game)
+        if(bookMove is not None):
+            self.playouts = 0
+            return bookMove
+        attacking = self == game.attackingPlayer
+        position = BitboardGame.fromGame(game).position()
+        start = time.monotonic()
+        tasks = [(position, attacking, self.timeBudget,
+                  self.random.getrandbits(64), self.exploration,
+                  self.maxPlayoutLength) for _ in range(self.workers)]
+        if(self.workers == 1):
+            results = [searchTree(*tasks[0])]
+        else:
+            if(self._executor is None):
+                self._executor = ProcessPoolExecutor(self.workers)
+            futures = [self._executor.submit(searchTree, *task)
+                       for task in tasks]
+            results = [future.result() for future in futures]
+        elapsed = time.monotonic() - start
+
+        visits = {}
+        self.playouts = 0
+        for (rootStats, playouts) in results:
+            self.playouts += playouts
+            for (key, (count, _)) in rootStats.items():
+                visits[key] = visits.get(key, 0) + count
+        self.playoutsPerSecond = self.playouts / elapsed if elapsed else 0.0
+        if(not visits):
+            return None
+        best = max(visits, key=visits.get)
+        return _findMove(game, self, best)
+
+    def close(self):
+        "Shuts down the worker processes, if any"
+        if(self._executor is not None):
+            self._executor.shutdown()
+            self._executor = None
+
+
+class _Node:
+    """Node of the search tree.
+    wins are counted for the side who played the move leading to the node."""
+
+    __slots__ = ('move', 'parent', 'children', 'untried', 'attacking',
+                 'visits', 'wins')
+
+    def __init__(self, move, parent, attacking, untried):
+        self.move = move
+        self.parent = parent
+        self.children = []
+        self.untried = untried
+        self.attacking = attacking
+        self.visits = 0
+        self.wins = 0.0
+
+    def select(self, exploration):
+        logVisits = math.log(self.visits)
+        return max(self.children,
+                   key=lambda c: (c.wins / c.visits +
+                                  exploration *
+                                  math.sqrt(logVisits / c.visits)))
+
+
+def searchTree(position, attacking, timeBudget, seed, exploration,
+               maxPlayoutLength):
+    """Grows a UCT tree from the given BitboardGame position, with the
+    attacking side to move if attacking is True, for timeBudget seconds.
+
+    Returns a tuple (rootStats, playouts) where rootStats maps each
+    explored root move (start, end) to a tuple (visits, wins).
+    Module level so that it can run in worker processes."""
+    rng = random.Random(seed)
+    deadline = time.monotonic() + timeBudget
+    rootGame = BitboardGame.fromPosition(position)
+    root = _Node(None, None, attacking, rootGame.moves(attacking))
+    rng.shuffle(root.untried)
+    playouts = 0
+    while(root.untried or root.children):
+        if(playouts & 15 == 0 and time.monotonic() > deadline):
+            break
+        game = rootGame.copy()
+        node = root
+        while(not node.untried and node.children):
+            node = node.select(exploration)
+            game.play(*node.move)
+        status = game.getStatus(node.attacking)
+        if(node.untried and status == GameStatus.IN_PROGRESS):
+            move = node.untried.pop()
+            game.play(*move)
+            side = not node.attacking
+            status = game.getStatus(side)
+            moves = (game.moves(side) if status == GameStatus.IN_PROGRESS
+                     else [])
+            rng.shuffle(moves)
+            child = _Node(move, node, side, moves)
+            node.children.append(child)
+            node = child
+        winner = _playout(game, node.attacking, status, rng, maxPlayoutLength)
+        playouts += 1
+        while(node is not None):
+            node.visits += 1
+            if(winner is None):
+                node.wins += 0.5
+            elif(winner != node.attacking):
+                node.wins += 1.0
+            node = node.parent
+    rootStats = dict((child.move, (child.visits, child.wins))
+                     for child in root.children)
+    return (rootStats, playouts)
+
+
+def _playout(game, attacking, status, rng, maxPlayoutLength):
+    """Plays random moves until the game is over.
+    Returns True if the attacker won, False if the defender won,
+    None for a draw (or a playout longer than maxPlayoutLength)."""
+    for _ in range(maxPlayoutLength):
+        if(status != GameStatus.IN_PROGRESS):
+            break
+        game.play(*rng.choice(game.moves(attacking)))
+        attacking = not attacking
+        status = game.getStatus(attacking)
+    if(status == GameStatus.ATTACKER_WON):
+        return True
+    if(status == GameStatus.DEFENDER_WON):
+        return False
+    return None
+
+
+def _findMove(game, player, squares):
+    "Returns the legal Move of the game matching bitboard squares"
+    stride = game.width + 2
+    (start, end) = (divmod(squares[0], stride), divmod(squares[1], stride))
+    for move in game.legalMoves(player):
+        if(move.startCell.position == start and move.endCell.position == end):
+            return move
+    return None
@@ -0,0 +1,130 @@
+import struct
+from ..game.game import Game, GameStatus
+from ..game.move import Move
+from ..game.player import Player
+from ..game.symmetry import SYMMETRIES, symmetricHashes, transformMove
+
+_ENTRY = struct.Struct(">QBBBBIII")
+
+
+class MoveStats:
+    """Statistics of a book move: number of games in which it was played,
+    and how many of them were won by the attacker and by the defender."""
+
+    __slots__ = ('count', 'attackerWins', 'defenderWins')
+
+    def __init__(self, count=0, attackerWins=0, defenderWins=0):
+        self.count = count
+        self.attackerWins = attackerWins
+        self.defenderWins = defenderWins
+
+    def add(self, result):
+        "Counts one more game with the given result (a GameStatus)"
+        self.count += 1
+        if(result == GameStatus.ATTACKER_WON):
+            self.attackerWins += 1
+        elif(result == GameStatus.DEFENDER_WON):
+            self.defenderWins += 1
+
+    def winRate(self, attacking):
+        "Returns the share of games won by the attacker (or defender)"
+        wins = self.attackerWins if attacking else self.defenderWins
+        return wins / self.count if self.count else 0.0
+
+    def __repr__(self):
+        return ("MoveStats(count=%r, attackerWins=%r, defenderWins=%r)" %
+                (self.count, self.attackerWins, self.defenderWins))
+
+
+class OpeningBook:
+    """Move statistics of the first moves of archived games,
+    keyed by position hash (see Game.hash).
+
+    Games are added with addRecord() (a GameRecord or RecordEntry), only
+    their first maxPlies moves being counted. Each position is counted
+    under the hashes of its 8 symmetric images (see symmetry), with the
+    move mapped accordingly, so that symmetric positions share their
+    statistics while lookup() stays a dictionary access with the
+    incremental hash of the game, during play. bestMove() gives the book
+    move a computer player should play, if any.
+
+    Books can be saved to and loaded from a binary stream.
+    """
+
+    def __init__(self, maxPlies=20, minCount=5):
+        self.maxPlies = maxPlies
+        self.minCount = minCount
+        self.positions = {}
+
+    def addRecord(self, record):
+        """Adds the opening moves of a game record (GameRecord or
+        RecordEntry) to the book."""
+        game = Game(Player(record.attackerName), Player(record.defenderName),
+                    record.size)
+        players = (game.attackingPlayer, game.defendingPlayer)
+        moves = record.moves
+        if(callable(moves)):
+            moves = ((start, end) for (start, end, _) in moves())
+        for (ply, (start, end)) in enumerate(moves):
+            if(ply >= self.maxPlies):
+                break
+            hashes = symmetricHashes(game)
+            images = set((hashes[symmetry],
+                          transformMove((start, end), symmetry, game.width))
+                         for symmetry in SYMMETRIES)
+            for (positionHash, key) in images:
+                stats = self.positions.setdefault(positionHash, {})
+                stats.setdefault(key, MoveStats()).add(record.result)
+            game.execute(Move(game.getCell(*start), game.getCell(*end),
+                              game, players[ply % 2]))
+
+    def addRecords(self, records):
+        "Adds all the given records (e.g. a RecordReader) to the book"
+        for record in records:
+            self.addRecord(record)
+
+    def lookup(self, game):
+        """Returns a dict mapping ((row, col), (row, col)) moves to their
+        MoveStats in the current position of the game (empty if unknown)."""
+        return dict(self.positions.get(game.hash, {}))
+
+    def bestMove(self, game, player):
+        """Returns the book Move with the best win rate for the player,
+        among moves played at least minCount times, or None."""
+        attacking = player == game.attackingPlayer
+        candidates = [(stats.winRate(attacking), stats.count, key)
+                      for (key, stats) in self.lookup(game).items()
+                      if stats.count >= self.minCount]
+        if(not candidates):
+            return None
+        (_, _, (start, end)) = max(candidates)
+        move = Move(game.getCell(*start), game.getCell(*end), game, player)
+        if(not move.isLegal()):
+            return None
+        return move
+
+    def save(self, stream):
+        "Writes the book to a binary stream"
+        for (positionHash, moves) in self.positions.items():
+            for (((r1, c1), (r2, c2)), stats) in moves.items():
+                stream.write(_ENTRY.pack(positionHash, r1, c1, r2, c2,
+                                         stats.count, stats.attackerWins,
+                                         stats.defenderWins))
+
+    @staticmethod
+    def load(stream, maxPlies=20, minCount=5):
+        "Reads a book written by save()"
+        book = OpeningBook(maxPlies, minCount)
+        data = stream.read()
+        for fields in _ENTRY.iter_unpack(data):
+            (positionHash, r1, c1, r2, c2) = fields[:5]
+            moves = book.positions.setdefault(positionHash, {})
+            moves[((r1, c1), (r2, c2))] = MoveStats(*fields[5:])
+        return book
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __repr__(self):
+        return ("OpeningBook(maxPlies=%r, minCount=%r, positions=%d)" %
+                (self.maxPlies, self.minCount, len(self.positions)))
@@ -0,0 +1,18 @@
+import random
+from ..game.player import ComputerPlayer
+
+
+class RandomPlayer(ComputerPlayer):
+    """Computer player picking one of its legal moves at random.
+    Mostly useful as a baseline and for self-play tests."""
+
+    def __init__(self, name, seed=None):
+        super().__init__(name)
+        self.random = random.Random(seed)
+
+    def chooseMove(self, game):
+        "Returns a random legal move, or None if the player cannot move"
+        moves = list(game.legalMoves(self))
+        if(not moves):
+            return None
+        return self.random.choice(moves)
@@ -0,0 +1,357 @@
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from math import comb
+from ..game.bitboard import BitboardGame, BitboardTables, _bits
+from ..game.game import GameStatus
+from ..game.move import Move
+
+UNKNOWN = 0
+INVALID = 255
+MAX_PLIES = 253
+
+WIN = 1
+LOSS = -1
+DRAW = 0
+
+
+def encode(plies):
+    """Returns the table value of a position decided in the given number
+    of plies: the side to move wins if plies is odd, loses if even."""
+    return plies + 1
+
+
+def decode(value):
+    """Returns (result, plies) for a table value, result being WIN, LOSS or
+    DRAW for the side to move, or None for an invalid position."""
+    if(value == INVALID):
+        return None
+    if(value == UNKNOWN):
+        return (DRAW, None)
+    plies = value - 1
+    return (WIN if plies % 2 else LOSS, plies)
+
+
+class TablebaseGeometry:
+    """Mapping between table indices and bitboard positions
+    for a board size and a material signature.
+
+    The king may stand on any playable square, other pawns on normal
+    squares only. Pawn sets are ranked in the combinatorial number system:
+    index = ((king * C(M, a) + rank(attackers)) * C(M, d)
+    + rank(defenders)) * 2 + side, with side 0 when the attacker is to move.
+    """
+
+    def __init__(self, size, attackers, defenders):
+        self.size = size
+        self.attackers = attackers
+        self.defenders = defenders
+        self.tables = BitboardTables.forSize(size)
+        self.kingSquares = list(_bits(self.tables.playable))
+        self.pawnSquares = list(_bits(self.tables.normal))
+        self.kingOrdinal = dict((sq, i) for (i, sq)
+                                in enumerate(self.kingSquares))
+        self.pawnOrdinal = dict((sq, i) for (i, sq)
+                                in enumerate(self.pawnSquares))
+        m = len(self.pawnSquares)
+        self.attackerSets = comb(m, attackers)
+        self.defenderSets = comb(m, defenders)
+        self.length = (len(self.kingSquares) * self.attackerSets *
+                       self.defenderSets * 2)
+
+    def rank(self, mask):
+        "Returns the rank of a set of pawns given as a bitboard mask"
+        ordinals = sorted(self.pawnOrdinal[sq] for sq in _bits(mask))
+        return sum(comb(c, i + 1) for (i, c) in enumerate(ordinals))
+
+    def index(self, king, attackers, defenders, attacking):
+        "Returns the table index of a position given as bitboard masks"
+        k = self.kingOrdinal[king.bit_length() - 1]
+        return ((((k * self.attackerSets + self.rank(attackers)) *
+                  self.defenderSets + self.rank(defenders)) * 2) +
+                (0 if attacking else 1))
+
+    def positions(self, kingOrdinal):
+        """Yields (index, king, attackers, defenders) for all the pawn
+        placements with the king on the given square, valid or not,
+        pawns possibly overlapping."""
+        king = 1 << self.kingSquares[kingOrdinal]
+        m = len(self.pawnSquares)
+        attackerMasks = _setMasks(self.pawnSquares, m, self.attackers)
+        defenderMasks = _setMasks(self.pawnSquares, m, self.defenders)
+        base = kingOrdinal * self.attackerSets
+        for (rankA, attackers) in attackerMasks:
+            rowBase = (base + rankA) * self.defenderSets
+            for (rankD, defenders) in defenderMasks:
+                yield ((rowBase + rankD) * 2, king, attackers, defenders)
+
+
+def _setMasks(squares, m, count):
+    "Returns the (rank, mask) of every set of count squares"
+    out = []
+    for ordinals in combinations(range(m), count):
+        mask = 0
+        for o in ordinals:
+            mask |= 1 << squares[o]
+        out.append((sum(comb(c, i + 1) for (i, c) in enumerate(ordinals)),
+                    mask))
+    return out
+
+
+class Tablebase:
+    """Endgame tablebase: for every position with the king and a few
+    attackers and defenders, whether the side to move wins, loses or
+    draws, and in how many plies (see encode/decode).
+
+    Tables are stored in a directory, one file per board size and
+    material signature (number of attackers and defenders), one byte
+    per position, and are memory-mapped when probed.
+
+    Tables are built with generate() by iterating over all positions:
+    a position is won in n plies when a move leads to a position lost in
+    n - 1 plies, lost when all moves lead to won positions. Captures lead
+    to positions of smaller tables, which are generated first. Positions
+    still undecided at the end are draws. Each iteration can be spread
+    over worker processes, which read the table through its file.
+    Rules are those of BitboardGame (same as Game, without repetitions),
+    and a side which cannot move loses.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._maps = {}
+
+    def path(self, size, attackers, defenders):
+        "Returns the file name of a table"
+        return os.path.join(self.directory, "tb%d_%da%dd.bin" %
+                            (size, attackers, defenders))
+
+    def has(self, size, attackers, defenders):
+        "Returns True if the table for this material has been generated"
+        return os.path.exists(self.path(size, attackers, defenders))
+
+    def table(self, size, attackers, defenders):
+        "Returns the (memory-mapped, read-only) table for this material"
+        key = (size, attackers, defenders)
+        if(key not in self._maps):
+            with open(self.path(*key), "rb") as tableFile:
+                self._maps[key] = mmap.mmap(tableFile.fileno(), 0,
+                                            access=mmap.ACCESS_READ)
+        return self._maps[key]
+
+    def value(self, size, king, attackers, defenders, attacking):
+        """Returns the table value of a position given as bitboard masks,
+        or None if its table has not been generated."""
+        a = _count(attackers)
+        d = _count(defenders)
+        if((size, a, d) not in self._maps and not self.has(size, a, d)):
+            return None
+        geometry = _geometry(size, a, d)
+        table = self.table(size, a, d)
+        return table[geometry.index(king, attackers, defenders, attacking)]
+
+    def probe(self, game, player):
+        """Returns (result, plies) for the given player to move in the
+        game (a Game or BitboardGame), see decode(),
+        or None if the position is not in the tablebase."""
+        bb = _bitboard(game)
+        value = self.value(bb.width, bb.king, bb.attackers, bb.defenders,
+                           player == game.attackingPlayer)
+        if(value is None):
+            return None
+        return decode(value)
+
+    def bestMove(self, game, player):
+        """Returns the best Move for the player according to the tables:
+        the fastest win, else a draw, else the slowest loss.
+        Returns None if the position is not in the tablebase."""
+        bb = _bitboard(game)
+        attacking = player == game.attackingPlayer
+        if(self.value(bb.width, bb.king, bb.attackers, bb.defenders,
+                      attacking) is None):
+            return None
+        best = None
+        for (start, end) in bb.moves(attacking):
+            child = bb.copy()
+            child.play(start, end)
+            value = self.value(child.width, child.king, child.attackers,
+                               child.defenders, not attacking)
+            if(value is None):
+                return None
+            (result, plies) = decode(value)
+            if(result == LOSS):
+                score = (2, -plies)
+            elif(result == DRAW):
+                score = (1, 0)
+            else:
+                score = (0, plies)
+            if(best is None or score > best[0]):
+                best = (score, start, end)
+        if(best is None):
+            return None
+        position = bb.tables.position
+        return Move(game.getCell(*position(best[1])),
+                    game.getCell(*position(best[2])), game, player)
+
+    def generate(self, size, attackers, defenders, workers=1):
+        """Generates the table for this material, and the smaller tables
+        it depends on, unless already generated.
+        With workers > 1 iterations run in a process pool."""
+        for a in range(attackers + 1):
+            for d in range(defenders + 1):
+                if(not self.has(size, a, d)):
+                    self._generate(size, a, d, workers)
+
+    def _generate(self, size, attackers, defenders, workers):
+        geometry = _geometry(size, attackers, defenders)
+        path = self.path(size, attackers, defenders)
+        building = path + ".part"
+        with open(building, "wb") as tableFile:
+            tableFile.truncate(geometry.length)
+        maxSubPlies = self._maxPlies(size, attackers, defenders)
+        kings = range(len(geometry.kingSquares))
+        executor = ProcessPoolExecutor(workers) if workers > 1 else None
+        try:
+            plies = 0
+            while(plies <= MAX_PLIES):
+                args = (self.directory, building, size, attackers, defenders,
+                        plies)
+                if(executor is None):
+                    chunks = [solveKingSquare(*(args + (k,))) for k in kings]
+                else:
+                    chunks = executor.map(solveKingSquare,
+                                          *zip(*[args + (k,) for k in kings]))
+                updated = self._applyUpdates(building, chunks)
+                if(not updated and plies > maxSubPlies + 1):
+                    break
+                plies += 1
+        finally:
+            if(executor is not None):
+                executor.shutdown()
+        os.replace(building, path)
+
+    def _applyUpdates(self, path, chunks):
+        updated = 0
+        with open(path, "r+b") as tableFile:
+            table = mmap.mmap(tableFile.fileno(), 0)
+            for updates in chunks:
+                for (index, value) in updates:
+                    table[index] = value
+                    updated += 1
+            table.flush()
+            table.close()
+        return updated
+
+    def _maxPlies(self, size, attackers, defenders):
+        "Returns the longest distance found in the tables of less material"
+        longest = 0
+        for a in range(attackers + 1):
+            for d in range(defenders + 1):
+                if((a, d) == (attackers, defenders)):
+                    continue
+                table = self.table(size, a, d)
+                for value in set(table[:]):
+                    if(value not in [UNKNOWN, INVALID]):
+                        longest = max(longest, value - 1)
+        return longest
+
+    def close(self):
+        "Releases the memory-mapped tables"
+        for table in self._maps.values():
+            table.close()
+        self._maps = {}
+
+    def __repr__(self):
+        return "Tablebase(directory=%r)" % self.directory
+
+
+_geometries = {}
+
+
+def _geometry(size, attackers, defenders):
+    key = (size, attackers, defenders)
+    if(key not in _geometries):
+        _geometries[key] = TablebaseGeometry(size, attackers, defenders)
+    return _geometries[key]
+
+
+def _count(mask):
+    return bin(mask).count("1")
+
+
+def _bitboard(game):
+    if(isinstance(game, BitboardGame)):
+        return game
+    return BitboardGame.fromGame(game)
+
+
+def solveKingSquare(directory, path, size, attackers, defenders, plies,
+                    kingOrdinal):
+    """Computes one iteration of the generation for the positions with
+    the king on the given square, reading the table being built at path.
+
+    Iteration 0 marks invalid and already decided positions, and those
+    where the side to move cannot move. Iteration
+    plies resolves the positions won or lost in exactly that many plies.
+    Returns the list of (index, value) updates.
+    Module level so that it can run in worker processes."""
+    geometry = _geometry(size, attackers, defenders)
+    tablebase = Tablebase(directory)
+    with open(path, "rb") as tableFile:
+        table = mmap.mmap(tableFile.fileno(), 0, access=mmap.ACCESS_READ)
+    tablebase._maps[(size, attackers, defenders)] = table
+    updates = []
+    bb = BitboardGame.fromPosition((size, 0, 0, 0))
+    for (index, king, attackerMask, defenderMask) in \
+            geometry.positions(kingOrdinal):
+        if(plies == 0):
+            if(attackerMask & defenderMask or
+               king & (attackerMask | defenderMask)):
+                updates.append((index, INVALID))
+                updates.append((index + 1, INVALID))
+                continue
+            bb.setPosition((size, attackerMask, defenderMask, king))
+            for side in (0, 1):
+                attacking = side == 0
+                status = bb.getStatus(attacking)
+                if(status == GameStatus.IN_PROGRESS):
+                    continue
+                # decided positions are only reached with the loser to move
+                if((status == GameStatus.ATTACKER_WON) == attacking):
+                    updates.append((index + side, INVALID))
+                else:
+                    updates.append((index + side, encode(0)))
+            continue
+        for side in (0, 1):
+            if(table[index + side] != UNKNOWN):
+                continue
+            bb.setPosition((size, attackerMask, defenderMask, king))
+            value = _solve(tablebase, bb, side == 0, plies)
+            if(value != UNKNOWN):
+                updates.append((index + side, value))
+    tablebase.close()
+    return updates
+
+
+def _solve(tablebase, bb, attacking, plies):
+    """Returns the value of the position if it is won or lost in exactly
+    the given number of plies, knowing the positions decided in fewer."""
+    allLost = True
+    for (start, end) in bb.moves(attacking):
+        child = bb.copy()
+        child.play(start, end)
+        value = tablebase.value(child.width, child.king, child.attackers,
+                                child.defenders, not attacking)
+        if(value == UNKNOWN):
+            allLost = False
+            continue
+        childPlies = value - 1
+        if(childPlies >= plies):
+            allLost = False
+            continue
+        if(childPlies % 2 == 0):
+            return encode(plies) if plies % 2 else UNKNOWN
+    if(allLost and plies % 2 == 0):
+        return encode(plies)
+    return UNKNOWN
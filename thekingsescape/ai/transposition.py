@@ -0,0 +1,61 @@
+from enum import Enum
+
+
+class Bound(Enum):
+    """Meaning of a value stored in the transposition table"""
+    EXACT = 1
+    LOWER = 2
+    UPPER = 3
+
+
+class TranspositionTable:
+    """Fixed-size table of search results keyed by position hash.
+
+    The table has a power of two number of slots and a position goes in the
+    slot given by the low bits of its hash, so memory use is bounded.
+    When two positions compete for a slot, the new entry replaces the old
+    one if it comes from the same position, from a newer search (see
+    newSearch()), or from a search at least as deep.
+
+    Entries are tuples (hash, depth, value, bound, bestMove, generation),
+    bestMove being a ((row, col), (row, col)) tuple or None.
+    """
+
+    def __init__(self, size=2 ** 16):
+        slots = 1
+        while(slots < size):
+            slots *= 2
+        self.mask = slots - 1
+        self.slots = [None] * slots
+        self.generation = 0
+
+    def newSearch(self):
+        """Marks the entries stored so far as old,
+        so that they get replaced first."""
+        self.generation += 1
+
+    def probe(self, positionHash):
+        "Returns the entry stored for the given hash, or None"
+        entry = self.slots[positionHash & self.mask]
+        if(entry is not None and entry[0] == positionHash):
+            return entry
+        return None
+
+    def store(self, positionHash, depth, value, bound, bestMove):
+        "Stores a search result, following the replacement policy"
+        index = positionHash & self.mask
+        old = self.slots[index]
+        if(old is None or old[0] == positionHash or
+           old[5] != self.generation or depth >= old[1]):
+            self.slots[index] = (positionHash, depth, value, bound,
+                                 bestMove, self.generation)
+
+    def clear(self):
+        "Removes all entries"
+        self.slots = [None] * len(self.slots)
+
+    def __len__(self):
+        return sum(1 for entry in self.slots if entry is not None)
+
+    def __repr__(self):
+        return "TranspositionTable(size=%r)" % len(self.slots)
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import websockets
+from .game.move import IllegalMoveException
+from .instrumentation import instrumentation
+from .text_app.view import AbstractView
+from .web_app.sessions import SessionException, SessionStore
+
+
+class WebSocketView(AbstractView):
+    """View pushing the updates of one game to its subscribed WebSockets.
+
+    Rather than the whole board, render() sends the last move: moved pawn,
+    start and end cells, captured cells, and the status when it changed.
+    The message is serialized once and broadcast to all subscribers,
+    slow clients being skipped by websockets.broadcast instead of
+    delaying the others.
+    """
+
+    def __init__(self, sessionId):
+        super().__init__()
+        self.sessionId = sessionId
+        self.subscribers = set()
+        self._status = None
+
+    def subscribe(self, websocket):
+        self.subscribers.add(websocket)
+
+    def unsubscribe(self, websocket):
+        self.subscribers.discard(websocket)
+
+    def diff(self, game):
+        "Returns the update message for the last move of the game"
+        record = game.history[-1]
+        update = {"type": "update", "id": self.sessionId,
+                  "moves": len(game.history),
+                  "pawn": str(record.pawn),
+                  "start": record.startCell.position,
+                  "end": record.endCell.position,
+                  "captured": [cell.position
+                               for (_, cell) in record.captured]}
+        status = game.getStatus()
+        if(status != self._status):
+            update["status"] = status.name
+            self._status = status
+        return update
+
+    def render(self, game, changes=None):
+        if(not game.history):
+            return
+        message = json.dumps(self.diff(game))
+        websockets.broadcast(self.subscribers, message)
+
+    def __repr__(self):
+        return ("WebSocketView(sessionId=%r, subscribers=%d)" %
+                (self.sessionId, len(self.subscribers)))
+
+
+class AsyncWebController():
+    """Asyncio server variant of WebController, talking JSON messages over
+    WebSockets instead of polled routes. Requires the websockets package.
+
+    Client messages have a "type" among:
+    - create (name) : creates a game, replies with its id and the token
+    of the attacking seat
+    - join (id, name) : takes the defending seat, replies with its token
+    - watch (id) : subscribes to a game as a spectator
+    - move (id, token, start, end) : plays a move, e.g. from 'D1' to 'D3'
+    - metrics : replies with the metrics of the instrumentation (see
+    Instrumentation.snapshot, enabled with instrument=True)
+
+    Creating, joining and watching a game reply with the whole board
+    once, and subscribe the client to the updates of the game, pushed by
+    its WebSocketView after each move (see GameSession.registerView).
+    Errors are replied as messages of type "error".
+    Games live in a SessionStore bounded by maxGames and idleTimeout.
+    """
+
+    def __init__(self, maxGames=10000, idleTimeout=3600, host='localhost',
+                 port=8765, instrument=False):
+        self.sessions = SessionStore(maxGames, idleTimeout)
+        self.host = host
+        self.port = port
+        self.instrument = instrument
+
+    def start(self):
+        if(self.instrument):
+            instrumentation.enable()
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        "Serves clients until cancelled"
+        async with websockets.serve(self.handler, self.host, self.port):
+            await asyncio.Future()
+
+    async def handler(self, websocket):
+        "Handles the messages of one client connection"
+        views = []
+        try:
+            async for message in websocket:
+                reply = self.handle(websocket, message, views)
+                if(reply is not None):
+                    await websocket.send(json.dumps(reply))
+        finally:
+            for view in views:
+                view.unsubscribe(websocket)
+
+    def handle(self, websocket, message, views):
+        """Processes one client message, returns the reply or None.
+        Views the client subscribes to are appended to views."""
+        try:
+            request = json.loads(message)
+            for field in self._stringFields:
+                if(field in request and not isinstance(request[field], str)):
+                    raise ValueError("Field %s must be a string" % field)
+            action = self._actions[request.get("type")]
+        except (ValueError, KeyError, AttributeError, TypeError):
+            return {"type": "error", "message": "Bad request"}
+        try:
+            (reply, session) = action(self, request)
+        except KeyError as e:
+            return {"type": "error", "message": "Missing field " + str(e)}
+        except SessionException as e:
+            return {"type": "error", "message": str(e)}
+        except IllegalMoveException as e:
+            return {"type": "error", "message": "Move not legal: " + str(e)}
+        if(session is not None):
+            view = self._view(session)
+            view.subscribe(websocket)
+            views.append(view)
+            reply["board"] = session.board()
+        return reply
+
+    def _view(self, session):
+        "Returns the WebSocketView of the session, registering it if needed"
+        for view in session.views:
+            if(isinstance(view, WebSocketView)):
+                return view
+        view = WebSocketView(session.id)
+        session.registerView(view)
+        return view
+
+    def _create(self, request):
+        session = self.sessions.create(request.get("name", "Player 1"))
+        return ({"type": "created", "id": session.id,
+                 "token": session.creatorToken, "role": "attacker"}, session)
+
+    def _join(self, request):
+        session = self.sessions.get(request["id"])
+        token = session.join(request.get("name", "Player 2"))
+        return ({"type": "joined", "id": session.id, "token": token,
+                 "role": "defender"}, session)
+
+    def _watch(self, request):
+        session = self.sessions.get(request["id"])
+        return ({"type": "watching", "id": session.id}, session)
+
+    def _move(self, request):
+        session = self.sessions.get(request["id"])
+        session.move(request.get("token"), request["start"], request["end"])
+        return (None, None)
+
+    def _metrics(self, request):
+        return ({"type": "metrics", "metrics": instrumentation.snapshot(),
+                 "games": len(self.sessions),
+                 "evicted": self.sessions.evicted}, None)
+
+    _stringFields = ("type", "id", "token", "name", "start", "end")
+
+    _actions = {"create": _create, "join": _join, "watch": _watch,
+                "move": _move, "metrics": _metrics}
+
+    def __repr__(self):
+        return ("AsyncWebController(host=%r, port=%r, sessions=%r)" %
+                (self.host, self.port, self.sessions))
@@ -0,0 +1,185 @@
+import numpy as np
+from .game import GameStatus
+from .bitboard import BitboardGame, BitboardTables, _bits
+
+EMPTY = 0
+ATTACKER = 1
+DEFENDER = 2
+KING = 3
+WALL = 4
+
+DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+
+
+def _shifted(a, dr, dc, fill=False):
+    """Returns b with b[..., r, c] = a[..., r + dr, c + dc],
+    set to fill where (r + dr, c + dc) is off the board."""
+    out = np.full_like(a, fill)
+    size = a.shape[-1]
+    rows = slice(max(0, -dr), size - max(0, dr))
+    cols = slice(max(0, -dc), size - max(0, dc))
+    srcRows = slice(max(0, dr), size + min(0, dr))
+    srcCols = slice(max(0, dc), size + min(0, dc))
+    out[..., rows, cols] = a[..., srcRows, srcCols]
+    return out
+
+
+class BatchBoards:
+    """Batch of boards of the same size, for vectorized evaluation
+    of thousands of positions at once. Requires numpy.
+
+    Boards are stored in boards, an (N, n+2, n+2) int8 array indexed like
+    Game.cells, with codes EMPTY, ATTACKER, DEFENDER, KING and WALL.
+    Castles are given by the (n+2, n+2) boolean array castles, shared by
+    all boards (a castle is EMPTY unless the king stands on it).
+
+    Main methods:
+
+    - play(starts, ends) : moves one pawn on every board and applies
+    captures (same sandwich rule as Game.isTakenBy)
+
+    - status(attacking) : status of every board with the given side to
+    move (same rules as Game.getStatus, except draws by repetition)
+
+    - moveMasks(attacking) : legal moves of one side on every board
+    """
+
+    def __init__(self, boards):
+        """Wraps an (N, n+2, n+2) int8 array of board codes.
+        The array is used as is, not copied."""
+        self.boards = boards
+        size = boards.shape[-1]
+        self.width = size - 2
+        self.castles = np.zeros((size, size), dtype=bool)
+        for (row, col) in [(1, 1), (1, self.width),
+                           (self.width, 1), (self.width, self.width)]:
+            self.castles[row, col] = True
+
+    @staticmethod
+    def fromPositions(positions):
+        "Returns a batch from a list of BitboardGame positions"
+        size = positions[0][0]
+        t = BitboardTables.forSize(size)
+        flat = np.zeros((len(positions), t.squares), dtype=np.int8)
+        walls = list(_bits(t.walls))
+        for (i, (_, attackers, defenders, king)) in enumerate(positions):
+            flat[i, walls] = WALL
+            flat[i, list(_bits(attackers))] = ATTACKER
+            flat[i, list(_bits(defenders))] = DEFENDER
+            flat[i, list(_bits(king))] = KING
+        return BatchBoards(flat.reshape(len(positions), t.stride, t.stride))
+
+    @staticmethod
+    def fromGames(games):
+        "Returns a batch holding the positions of Game or BitboardGame objects"
+        positions = []
+        for game in games:
+            if(not isinstance(game, BitboardGame)):
+                game = BitboardGame.fromGame(game)
+            positions.append(game.position())
+        return BatchBoards.fromPositions(positions)
+
+    def position(self, index):
+        "Returns the BitboardGame position of the board at the given index"
+        flat = self.boards[index].reshape(-1)
+
+        def mask(code):
+            m = 0
+            for i in np.flatnonzero(flat == code):
+                m |= 1 << int(i)
+            return m
+
+        return (self.width, mask(ATTACKER), mask(DEFENDER), mask(KING))
+
+    def __len__(self):
+        return self.boards.shape[0]
+
+    def play(self, starts, ends):
+        """Moves the pawn at starts[i] to ends[i] on board i, for all boards,
+        without legality checks, and removes captured pawns.
+        starts and ends are (N, 2) integer arrays of (row, col).
+        Returns an (N, n+2, n+2) boolean array of the captured cells."""
+        boards = self.boards
+        size = boards.shape[-1]
+        index = np.arange(len(boards))
+        (startRows, startCols) = (starts[:, 0], starts[:, 1])
+        (endRows, endCols) = (ends[:, 0], ends[:, 1])
+        movers = boards[index, startRows, startCols]
+        boards[index, startRows, startCols] = EMPTY
+        boards[index, endRows, endCols] = movers
+        attacking = movers == ATTACKER
+        captured = np.zeros(boards.shape, dtype=bool)
+        for (dr, dc) in DIRECTIONS:
+            victimRows = np.clip(endRows + dr, 0, size - 1)
+            victimCols = np.clip(endCols + dc, 0, size - 1)
+            beyondRows = np.clip(endRows + 2 * dr, 0, size - 1)
+            beyondCols = np.clip(endCols + 2 * dc, 0, size - 1)
+            victims = boards[index, victimRows, victimCols]
+            beyond = boards[index, beyondRows, beyondCols]
+            enemy = np.where(attacking, victims == DEFENDER,
+                             victims == ATTACKER)
+            friend = np.where(attacking, beyond == ATTACKER,
+                              (beyond == DEFENDER) | (beyond == KING))
+            blocking = (friend | (beyond == WALL) |
+                        self.castles[beyondRows, beyondCols])
+            taken = enemy & blocking
+            captured[index[taken], victimRows[taken], victimCols[taken]] = True
+        boards[captured] = EMPTY
+        return captured
+
+    def status(self, attacking=None):
+        """Returns an (N,) int8 array of GameStatus values for all boards:
+        DEFENDER_WON if the king is on a castle, ATTACKER_WON if it is
+        surrounded by attackers, walls or castles, IN_PROGRESS otherwise.
+        If the side to move is given (attacking), boards where it cannot
+        move are lost for it."""
+        kings = self.boards == KING
+        onCastle = (kings & self.castles).any(axis=(1, 2))
+        blocking = ((self.boards == ATTACKER) | (self.boards == WALL) |
+                    self.castles)
+        surrounded = kings.copy()
+        for (dr, dc) in DIRECTIONS:
+            surrounded &= _shifted(blocking, dr, dc)
+        out = np.full(len(self.boards), GameStatus.IN_PROGRESS.value,
+                      dtype=np.int8)
+        if(attacking is not None):
+            masks = self.moveMasks(attacking)
+            stuck = ~masks.reshape(len(self.boards), -1).any(axis=1)
+            out[stuck] = (GameStatus.DEFENDER_WON.value if attacking
+                          else GameStatus.ATTACKER_WON.value)
+        out[surrounded.any(axis=(1, 2))] = GameStatus.ATTACKER_WON.value
+        out[onCastle] = GameStatus.DEFENDER_WON.value
+        return out
+
+    def moveMasks(self, attacking):
+        """Returns the legal moves of one side on all boards, as an
+        (N, 4, n, n+2, n+2) boolean array: masks[i, d, k - 1, r, c] is True
+        if the pawn at (r, c) on board i can move k cells in direction
+        DIRECTIONS[d]. Only the king may stop on castles."""
+        boards = self.boards
+        empty = boards == EMPTY
+        pawnFree = empty & ~self.castles
+        if(attacking):
+            sources = [(boards == ATTACKER, pawnFree)]
+        else:
+            sources = [(boards == DEFENDER, pawnFree), (boards == KING, empty)]
+        masks = np.zeros((len(boards), 4, self.width) + boards.shape[1:],
+                         dtype=bool)
+        for (d, (dr, dc)) in enumerate(DIRECTIONS):
+            for (pieces, free) in sources:
+                reach = pieces
+                for k in range(1, self.width + 1):
+                    reach = reach & _shifted(free, k * dr, k * dc)
+                    if(not reach.any()):
+                        break
+                    masks[:, d, k - 1] |= reach
+        return masks
+
+    def moveCounts(self, attacking):
+        "Returns an (N,) array with the number of legal moves of one side"
+        return self.moveMasks(attacking).sum(axis=(1, 2, 3, 4))
+
+    def __repr__(self):
+        return "BatchBoards(boards=<%d boards of size %d>)" % (len(self),
+                                                                self.width)
+
@@ -0,0 +1,434 @@
+from .cell import Cell, CellType
+from .game import Game, GameStatus
+from .move import IllegalMoveException, Move, MoveRecord
+from .pawn import Attacker, Defender, King
+from .tables import BoardTables
+
+
+class BitboardTables:
+    """Masks and rays shared by all bitboard games of a given size.
+
+    Squares are indexed as row * (size + 2) + col, walls included,
+    so that indices match the (row, col) positions of Game.cells.
+    Use BitboardTables.forSize(size) rather than the constructor.
+    """
+
+    _cache = {}
+
+    def __init__(self, size):
+        self.width = size
+        self.stride = size + 2
+        self.squares = self.stride * self.stride
+        corners = [(1, 1), (1, size), (size, 1), (size, size)]
+        self.castles = 0
+        for (row, col) in corners:
+            self.castles |= 1 << self.index(row, col)
+        self.playable = 0
+        for row in range(1, size + 1):
+            for col in range(1, size + 1):
+                self.playable |= 1 << self.index(row, col)
+        self.walls = ((1 << self.squares) - 1) & ~self.playable
+        self.normal = self.playable & ~self.castles
+        self.directions = (1, -1, self.stride, -self.stride)
+        self.neighbours = [self._neighbourMask(i)
+                           for i in range(self.squares)]
+        self.rays = [self._rays(i) for i in range(self.squares)]
+
+    @staticmethod
+    def forSize(size):
+        "Returns the (cached) tables for boards of the given size"
+        tables = BitboardTables._cache.get(size)
+        if(tables is None):
+            tables = BitboardTables(size)
+            BitboardTables._cache[size] = tables
+        return tables
+
+    def index(self, row, col):
+        "Returns the square index of the given (row, column)"
+        return row * self.stride + col
+
+    def position(self, index):
+        "Returns the (row, column) of the given square index"
+        return divmod(index, self.stride)
+
+    def _neighbourMask(self, index):
+        mask = 0
+        for d in self.directions:
+            if(0 <= index + d < self.squares):
+                mask |= 1 << (index + d)
+        return mask
+
+    def _rays(self, index):
+        """Returns a tuple (direction, mask) for each of the 4 directions,
+        the mask covering the playable squares from index to the border."""
+        if(not (self.playable >> index) & 1):
+            return ()
+        rays = []
+        for d in self.directions:
+            mask = 0
+            i = index + d
+            while((self.playable >> i) & 1):
+                mask |= 1 << i
+                i += d
+            rays.append((d, mask))
+        return tuple(rays)
+
+
+def _bits(mask):
+    "Yields the indices of the set bits of the given mask"
+    while(mask):
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class BitboardGame:
+    """Compact alternative to Game storing the board as integer bitmasks.
+
+    Implements the playing subset of the contract of Game: execute(move),
+    legalMoves(player), getStatus(), isOver(), getCell(row, col) and cells,
+    enough for TextController, HeadlessController, TextView and
+    MoveFactory. There is no history, undo() or hash (see Controller).
+    Cells returned by getCell() and cells
+    are snapshots built on demand: modifying them does not affect the game.
+
+    The whole position is held in a few integers (see position()),
+    which makes copy() cheap and positions easy to send between processes.
+    The fast paths for analysis code are moves(attacking) and play(start, end),
+    working with square indices rather than Cell and Move objects.
+
+    The side to move (attackerToMove) is only kept up to date by execute().
+    Analysis code using play() tracks it itself and passes it to
+    getStatus(attacking), which also applies the rule that a side which
+    cannot move has lost.
+    """
+
+    __slots__ = ('attackingPlayer', 'defendingPlayer', 'tables',
+                 'attackers', 'defenders', 'king', 'attackerToMove',
+                 '_kingPawn')
+
+    def __init__(self, attackingPlayer, defendingPlayer, size=11):
+        """Creates a bitboard game of the given size (width)
+        with the two given players, in starting position."""
+        self.attackingPlayer = attackingPlayer
+        self.defendingPlayer = defendingPlayer
+        self.tables = BitboardTables.forSize(size)
+        self._kingPawn = King(self.defendingPlayer)
+        self.attackerToMove = True
+        self.populate()
+
+    @property
+    def width(self):
+        return self.tables.width
+
+    @property
+    def cells(self):
+        "Snapshot of the board as a 2D list of cells (see Game.cells)"
+        return [[self.getCell(row, col) for col in range(self.tables.stride)]
+                for row in range(self.tables.stride)]
+
+    def populate(self):
+        """Sets the board to the starting position, same as Game.populate"""
+        t = self.tables
+        n = t.width
+        attackers = [(6, 2), (2, 6), (10, 6), (6, 10)]
+        for i in range(4, 9):
+            attackers.extend([(i, 1), (i, n), (1, i), (n, i)])
+        defenders = []
+        for i in [4, 5, 7, 8]:
+            defenders.extend([(i, 6), (6, i)])
+        for i in [5, 7]:
+            for j in [5, 7]:
+                defenders.append((i, j))
+        self.attackers = 0
+        for (row, col) in attackers:
+            self.attackers |= 1 << t.index(row, col)
+        self.defenders = 0
+        for (row, col) in defenders:
+            self.defenders |= 1 << t.index(row, col)
+        self.king = 1 << t.index(6, 6)
+
+    def position(self):
+        "Returns the position as a tuple (size, attackers, defenders, king)"
+        return (self.tables.width, self.attackers, self.defenders, self.king)
+
+    def setPosition(self, position):
+        "Sets the board to a position returned by position()"
+        (size, self.attackers, self.defenders, self.king) = position
+        self.tables = BitboardTables.forSize(size)
+
+    @staticmethod
+    def fromPosition(position, attackingPlayer=None, defendingPlayer=None,
+                     attackerToMove=True):
+        """Returns a bitboard game in a position returned by position().
+        Players are only needed for the Move based methods."""
+        bb = BitboardGame.__new__(BitboardGame)
+        bb.attackingPlayer = attackingPlayer
+        bb.defendingPlayer = defendingPlayer
+        bb.attackerToMove = attackerToMove
+        bb._kingPawn = King(defendingPlayer)
+        bb.setPosition(position)
+        return bb
+
+    def copy(self):
+        "Returns an independent copy of the game"
+        other = BitboardGame.__new__(BitboardGame)
+        other.attackingPlayer = self.attackingPlayer
+        other.defendingPlayer = self.defendingPlayer
+        other.tables = self.tables
+        other._kingPawn = self._kingPawn
+        other.attackers = self.attackers
+        other.defenders = self.defenders
+        other.king = self.king
+        other.attackerToMove = self.attackerToMove
+        return other
+
+    @staticmethod
+    def fromGame(game):
+        "Returns a bitboard game in the same position as the given Game"
+        bb = BitboardGame.__new__(BitboardGame)
+        bb.attackingPlayer = game.attackingPlayer
+        bb.defendingPlayer = game.defendingPlayer
+        bb.tables = BitboardTables.forSize(game.width)
+        bb._kingPawn = game.king
+        bb.attackerToMove = game.attackerToMove
+        bb.attackers = 0
+        bb.defenders = 0
+        bb.king = 0
+        for row in game.cells:
+            for cell in row:
+                if(cell.isOccupied()):
+                    bit = 1 << bb.tables.index(*cell.position)
+                    pawn = cell.getPawn()
+                    if(pawn is game.king):
+                        bb.king = bit
+                    elif(pawn.owner == game.attackingPlayer):
+                        bb.attackers |= bit
+                    else:
+                        bb.defenders |= bit
+        return bb
+
+    def occupied(self):
+        "Returns the mask of all occupied squares"
+        return self.attackers | self.defenders | self.king
+
+    def moves(self, attacking):
+        """Returns the list of legal (start, end) square index pairs
+        for the attacking side (attacking=True) or the defending side."""
+        t = self.tables
+        occupied = self.attackers | self.defenders | self.king
+        out = []
+        if(attacking):
+            pieces = self.attackers
+        else:
+            pieces = self.defenders | self.king
+        for start in _bits(pieces):
+            blockers = occupied
+            if(not (self.king >> start) & 1):
+                blockers |= t.castles
+            for (d, ray) in t.rays[start]:
+                hits = ray & blockers
+                if(hits):
+                    if(d > 0):
+                        reach = ray & ((hits & -hits) - 1)
+                    else:
+                        reach = ray & ~((1 << hits.bit_length()) - 1)
+                else:
+                    reach = ray
+                for end in _bits(reach):
+                    out.append((start, end))
+        return out
+
+    def canMove(self, attacking):
+        """Returns True if the attacking side (attacking=True) or the
+        defending side has at least one legal move"""
+        t = self.tables
+        occupied = self.attackers | self.defenders | self.king
+        pieces = self.attackers if attacking else self.defenders | self.king
+        for start in _bits(pieces):
+            blockers = occupied
+            if(not (self.king >> start) & 1):
+                blockers |= t.castles
+            for (d, ray) in t.rays[start]:
+                if(ray & ~blockers & (1 << (start + d))):
+                    return True
+        return False
+
+    def legalMoves(self, player):
+        "Yields all the legal moves of the given player (see Game.legalMoves)"
+        attacking = player == self.attackingPlayer
+        position = self.tables.position
+        for (start, end) in self.moves(attacking):
+            yield Move(self.getCell(*position(start)),
+                       self.getCell(*position(end)), self, player)
+
+    def play(self, start, end):
+        """Moves the pawn on square start to square end, without any
+        legality check, and applies captures.
+        Returns the mask of the captured pawns."""
+        t = self.tables
+        move = (1 << start) | (1 << end)
+        attacking = (self.attackers >> start) & 1
+        if(attacking):
+            self.attackers ^= move
+            victims = self.defenders
+            friends = self.attackers
+        else:
+            if((self.king >> start) & 1):
+                self.king ^= move
+            else:
+                self.defenders ^= move
+            victims = self.attackers
+            friends = self.defenders | self.king
+        blocking = friends | t.walls | t.castles
+        captured = 0
+        for d in t.directions:
+            victim = end + d
+            if((victims >> victim) & 1 and (blocking >> (victim + d)) & 1):
+                captured |= 1 << victim
+        if(captured):
+            if(attacking):
+                self.defenders &= ~captured
+            else:
+                self.attackers &= ~captured
+        return captured
+
+    def _whyNotLegal(self, start, end, player):
+        """Returns None if moving from square start to square end is legal
+        for the given player, or a string describing why it is not.
+        Mirrors the checks (and messages) of Move."""
+        t = self.tables
+        occupied = self.attackers | self.defenders | self.king
+        if(not (occupied >> start) & 1):
+            return "Cannot get pawn of empty cell"
+        allowed = t.playable if (self.king >> start) & 1 else t.normal
+        if(not (allowed >> end) & 1):
+            return ("This pawn (%r) cannot go on this type of cell (%r)" %
+                    (self._pawnAt(start), self._cellType(end)))
+        owner = (self.attackingPlayer if (self.attackers >> start) & 1
+                 else self.defendingPlayer)
+        if(not owner == player):
+            return ("Player (%r) is not allowed to move that pawn (%r)" %
+                    (player, self._pawnAt(start)))
+        (startRow, startCol) = t.position(start)
+        (endRow, endCol) = t.position(end)
+        if(startRow == endRow):
+            step = 1
+        elif(startCol == endCol):
+            step = t.stride
+        else:
+            return "Move is not a straight line"
+        for i in range(min(start, end) + step, max(start, end), step):
+            if((occupied >> i) & 1):
+                return "There are pawns on the path"
+        if((occupied >> end) & 1):
+            return "Targeted cell is already occupied"
+        return None
+
+    def execute(self, move):
+        """Performs the given move and all side effects.
+        Only the positions of the move cells and its player are used.
+        Returns a MoveRecord (with snapshot cells), like Game.execute.
+        Raises IllegalMoveException if the move is not legal."""
+        t = self.tables
+        start = t.index(*move.startCell.position)
+        end = t.index(*move.endCell.position)
+        reason = self._whyNotLegal(start, end, move.player)
+        if(reason is not None):
+            raise IllegalMoveException(reason)
+        pawn = self._pawnAt(start)
+        taken = self.play(start, end)
+        self.attackerToMove = not self.attackerToMove
+        if(pawn.owner == self.attackingPlayer):
+            victim = Defender
+            owner = self.defendingPlayer
+        else:
+            victim = Attacker
+            owner = self.attackingPlayer
+        captured = [(victim(owner), self.getCell(*t.position(i)))
+                    for i in _bits(taken)]
+        return MoveRecord(pawn, self.getCell(*move.startCell.position),
+                          self.getCell(*move.endCell.position), captured)
+
+    def getStatus(self, attacking=None):
+        """Returns the current status of the game (see Enum class GameStatus)
+        with the attacking side (attacking=True) or the defending side to
+        move, by default the side to move after execute() (attackerToMove).
+        Draws by repetition are not detected."""
+        t = self.tables
+        if(self.king & t.castles):
+            return GameStatus.DEFENDER_WON
+        around = t.neighbours[self.king.bit_length() - 1]
+        if(around & (t.walls | t.castles | self.attackers) == around):
+            return GameStatus.ATTACKER_WON
+        if(attacking is None):
+            attacking = self.attackerToMove
+        if(not self.canMove(attacking)):
+            return (GameStatus.DEFENDER_WON if attacking
+                    else GameStatus.ATTACKER_WON)
+        return GameStatus.IN_PROGRESS
+
+    def isOver(self):
+        "Returns True if the game is over (won or lost)"
+        return self.getStatus() is not GameStatus.IN_PROGRESS
+
+    def _cellType(self, index):
+        t = self.tables
+        if((t.castles >> index) & 1):
+            return CellType.CASTLE
+        if((t.playable >> index) & 1):
+            return CellType.NORMAL
+        (row, col) = t.position(index)
+        if(col in [0, t.stride - 1]):
+            return CellType.VWALL
+        return CellType.HWALL
+
+    def _pawnAt(self, index):
+        if((self.king >> index) & 1):
+            return self._kingPawn
+        if((self.attackers >> index) & 1):
+            return Attacker(self.attackingPlayer)
+        if((self.defenders >> index) & 1):
+            return Defender(self.defendingPlayer)
+        return None
+
+    def getCell(self, rowIndex, colIndex):
+        """Returns a snapshot of the cell at the corresponding (row, column).
+        Raises IndexError outside of the board, like Game.getCell."""
+        t = self.tables
+        if(not (0 <= rowIndex < t.stride and 0 <= colIndex < t.stride)):
+            raise IndexError("Cell out of the board: " +
+                             repr((rowIndex, colIndex)))
+        index = t.index(rowIndex, colIndex)
+        cell = Cell(self._cellType(index))
+        positions = BoardTables.forSize(t.width).positions
+        cell.setPosition(positions[rowIndex][colIndex])
+        pawn = self._pawnAt(index)
+        if(pawn is not None):
+            cell.placePawn(pawn)
+        return cell
+
+    def toGame(self):
+        "Returns a Game (object engine) in the same position and side to move"
+        game = Game(self.attackingPlayer, self.defendingPlayer, self.width)
+        for row in game.cells:
+            for cell in row:
+                if(cell.isOccupied()):
+                    cell.takePawn()
+        game.king = self._kingPawn
+        for (row, col) in self._squares(self.attackers):
+            game.getCell(row, col).placePawn(Attacker(self.attackingPlayer))
+        for (row, col) in self._squares(self.defenders):
+            game.getCell(row, col).placePawn(Defender(self.defendingPlayer))
+        for (row, col) in self._squares(self.king):
+            game.getCell(row, col).placePawn(self._kingPawn)
+        game.refreshState(self.attackerToMove)
+        return game
+
+    def _squares(self, mask):
+        return [self.tables.position(i) for i in _bits(mask)]
+
+    def __repr__(self):
+        return ("BitboardGame(attackingPlayer=%r, defendingPlayer=%r, "
+                "size=%r)" %
+                (self.attackingPlayer, self.defendingPlayer, self.width))
@@ -29,8 +29,12 @@ class Cell:
 
     A cell has a type (of class CellType) and can have an occupant (a pawn).
     Cells get attributed a position in the game when the board is created.
+    Cells are slotted (no instance dict) as a game holds (n+2)^2 of them;
+    positions are the tuples shared by all games (see BoardTables).
     """
 
+    __slots__ = ('pawn', 'type', 'position')
+
     def __init__(self, cellType):
         self.pawn = None
         self.type = cellType
@@ -78,7 +82,7 @@ class Cell:
 
     def __repr__(self):
         return ("Cell(type=%r, row=%r, col=%r, occupant=%r)" %
-                (self.type, self.position[0], self.position[1], self.occupant))
+                (self.type, self.position[0], self.position[1], self.pawn))
 
     def glimpse(self):
         """Returns the cell symbol to use in a text view of the game"""
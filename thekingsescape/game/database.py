@@ -0,0 +1,282 @@
+import heapq
+import io
+import mmap
+import os
+import struct
+import tempfile
+from .game import Game, GameStatus
+from .move import IllegalMoveException
+from .record import RecordReader
+from .symmetry import canonicalHash
+
+INDEX_MAGIC = b"TKI2"
+
+_INDEX_HEADER = struct.Struct("<4sQQ")
+_POSITION = struct.Struct("<QQ")
+_GAME = struct.Struct("<BQ")
+
+
+class GameDatabase:
+    """Read-only database of archived games, queried through memory maps.
+
+    The database file is a sequence of game records (see GameRecord) and
+    games are identified by the offset of their record in the file.
+    A companion index file (path + ".idx", built by buildIndex() if
+    missing) holds:
+
+    - the (canonical hash, game offset) pairs of every position reached in
+    every game, sorted by hash, for gamesReaching(). Hashes are those of
+    symmetry.canonicalHash, so that a query also finds the games reaching
+    a symmetric position (rotated or mirrored board).
+
+    - the (castle, game offset) pairs of every game, sorted by castle,
+    where castle is 1 to 4 for games won by the defender in the castle
+    castlePositions(size)[castle - 1] and 0 for other games,
+    for gamesEscapingVia()
+
+    All the games of a database are expected to have the same board size.
+
+    Both files are memory-mapped and searched by bisection, so queries do
+    not load the archive in memory. Hashes are 64-bit, so a query may very
+    rarely return a game which does not reach the position.
+    Call close() (or use as a context manager) to release the maps.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.indexPath = path + ".idx"
+        if(not os.path.exists(self.indexPath)):
+            GameDatabase.buildIndex(path)
+        self._dataFile = open(path, "rb")
+        self._indexFile = open(self.indexPath, "rb")
+        self._data = _map(self._dataFile)
+        self._index = _map(self._indexFile)
+        (magic, self.positionCount, self.gameCount) = \
+            _INDEX_HEADER.unpack_from(self._index, 0)
+        if(magic != INDEX_MAGIC):
+            raise ValueError("Not a game database index: " + self.indexPath)
+        self._positionsStart = _INDEX_HEADER.size
+        self._gamesStart = (self._positionsStart +
+                            self.positionCount * _POSITION.size)
+        self.size = None
+        if(self.gameCount):
+            self.size = self.entry(self.gameOffset(0)).size
+
+    @staticmethod
+    def buildIndex(path, chunkSize=1 << 20):
+        """Replays every game of the database file through Game.execute()
+        and writes the position and castle index next to it.
+        Games with an illegal move are left out of the index, and returned
+        as a list of (offset, IllegalMoveException) pairs.
+        Index entries are sorted in bounded memory (see _ExternalSort),
+        at most chunkSize entries of each kind being held at a time."""
+        positions = _ExternalSort(_POSITION, chunkSize)
+        games = _ExternalSort(_GAME, chunkSize)
+        skipped = []
+        with open(path, "rb") as dataFile:
+            data = _map(dataFile)
+            reader = RecordReader(data)
+            while(True):
+                offset = data.tell()
+                entry = reader.readEntry()
+                if(entry is None):
+                    break
+                record = entry.read()
+                game = None
+                hashes = set([_startHash(record.size)])
+                try:
+                    for game in record.replay(Game):
+                        hashes.add(canonicalHash(game)[0])
+                except IllegalMoveException as e:
+                    skipped.append((offset, e))
+                    continue
+                for h in hashes:
+                    positions.add((h, offset))
+                castle = _escapeCastle(game) if game is not None else 0
+                games.add((castle, offset))
+            data.close()
+        with open(path + ".idx", "wb") as indexFile:
+            indexFile.write(_INDEX_HEADER.pack(INDEX_MAGIC, positions.count,
+                                               games.count))
+            positions.write(indexFile)
+            games.write(indexFile)
+        return skipped
+
+    def gamesReaching(self, position):
+        """Returns the offsets of the games reaching the given position or
+        a symmetric one, given as a game or as a canonical hash."""
+        if(hasattr(position, "hash")):
+            positionHash = canonicalHash(position)[0]
+        else:
+            positionHash = position
+        first = self._bisect(self._positionsStart, self.positionCount,
+                             _POSITION, positionHash)
+        offsets = []
+        for i in range(first, self.positionCount):
+            (h, offset) = _POSITION.unpack_from(
+                self._index, self._positionsStart + i * _POSITION.size)
+            if(h != positionHash):
+                break
+            offsets.append(offset)
+        return offsets
+
+    def gamesEscapingVia(self, castle):
+        """Returns the offsets of the games won by the defender with the
+        king reaching the given castle, a (row, col) position."""
+        code = castlePositions(self.size).index(tuple(castle)) + 1
+        first = self._bisect(self._gamesStart, self.gameCount, _GAME, code)
+        offsets = []
+        for i in range(first, self.gameCount):
+            (c, offset) = _GAME.unpack_from(
+                self._index, self._gamesStart + i * _GAME.size)
+            if(c != code):
+                break
+            offsets.append(offset)
+        return offsets
+
+    def gameOffset(self, i):
+        "Returns the offset of the i-th game of the index (by castle, offset)"
+        return _GAME.unpack_from(self._index,
+                                 self._gamesStart + i * _GAME.size)[1]
+
+    def entry(self, offset):
+        """Returns the RecordEntry of the game at the given offset,
+        reading its moves lazily from the map.
+        Entries read from their own position in the map, so that readers
+        of the database do not move each other's cursor."""
+        return RecordReader(_MapStream(self._data, offset)).readEntry()
+
+    def record(self, offset):
+        "Returns the GameRecord of the game at the given offset"
+        return self.entry(offset).read()
+
+    def _bisect(self, start, count, entryStruct, key):
+        "Returns the index of the first entry whose key is not less than key"
+        (low, high) = (0, count)
+        while(low < high):
+            mid = (low + high) // 2
+            if(entryStruct.unpack_from(self._index,
+                                       start + mid * entryStruct.size)[0] <
+               key):
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def __len__(self):
+        return self.gameCount
+
+    def close(self):
+        "Releases the memory maps and files"
+        for resource in [self._data, self._index,
+                         self._dataFile, self._indexFile]:
+            resource.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __repr__(self):
+        return "GameDatabase(path=%r)" % self.path
+
+
+class _ExternalSort:
+    """Sorts entries of a fixed-size struct in bounded memory.
+    Entries are buffered and sorted by chunks of chunkSize entries,
+    spilled to temporary files, and the sorted runs are merged by write()."""
+
+    def __init__(self, entryStruct, chunkSize):
+        self.entryStruct = entryStruct
+        self.chunkSize = chunkSize
+        self.count = 0
+        self._buffer = []
+        self._runs = []
+
+    def add(self, entry):
+        self._buffer.append(entry)
+        self.count += 1
+        if(len(self._buffer) >= self.chunkSize):
+            self._spill()
+
+    def _spill(self):
+        self._buffer.sort()
+        run = tempfile.TemporaryFile()
+        pack = self.entryStruct.pack
+        run.write(b"".join(pack(*entry) for entry in self._buffer))
+        run.seek(0)
+        self._runs.append(run)
+        self._buffer = []
+
+    def _readRun(self, run):
+        chunk = self.entryStruct.size * 4096
+        while(True):
+            data = run.read(chunk)
+            if(not data):
+                break
+            yield from self.entryStruct.iter_unpack(data)
+
+    def write(self, stream):
+        "Writes all the entries, sorted and packed, to the stream"
+        self._buffer.sort()
+        runs = [self._readRun(run) for run in self._runs]
+        runs.append(self._buffer)
+        pack = self.entryStruct.pack
+        for entry in heapq.merge(*runs):
+            stream.write(pack(*entry))
+        for run in self._runs:
+            run.close()
+        self._runs = []
+        self._buffer = []
+
+
+class _MapStream:
+    """Read-only stream over a memory map from the given offset,
+    with its own position instead of the shared cursor of the map."""
+
+    __slots__ = ('_data', '_position')
+
+    def __init__(self, data, offset):
+        self._data = data
+        self._position = offset
+
+    def read(self, size):
+        data = self._data[self._position:self._position + size]
+        self._position += len(data)
+        return data
+
+    def tell(self):
+        return self._position
+
+
+def castlePositions(size):
+    "Returns the castle positions, in the order of their codes"
+    return [(1, 1), (1, size), (size, 1), (size, size)]
+
+
+def _escapeCastle(game):
+    "Returns the code of the castle the king escaped to, or 0"
+    if(game.getStatus() != GameStatus.DEFENDER_WON):
+        return 0
+    castles = castlePositions(game.width)
+    kingPositions = [(row, col) for (row, col) in castles
+                     if game.getCell(row, col).isOccupied()]
+    return castles.index(kingPositions[0]) + 1
+
+
+_startHashes = {}
+
+
+def _startHash(size):
+    "Returns the hash of the starting position of the given size"
+    if(size not in _startHashes):
+        _startHashes[size] = canonicalHash(Game(None, None, size))[0]
+    return _startHashes[size]
+
+
+def _map(fileObject):
+    "Returns a read-only memory map of the file (an empty buffer if empty)"
+    if(os.fstat(fileObject.fileno()).st_size == 0):
+        return io.BytesIO()
+    return mmap.mmap(fileObject.fileno(), 0, access=mmap.ACCESS_READ)
@@ -1,13 +1,10 @@
 from .cell import Cell, CellType
+from .move import Legality, Move, MoveRecord
 from .pawn import Attacker, Defender, King
-from enum import Enum
-
-
-class GameStatus(Enum):
-    IN_PROGRESS = 1
-    DEFENDER_WON = 2
-    ATTACKER_WON = 3
-    DRAW = 4
+from .snapshot import GameSnapshot
+from .status import GameStatus
+from .tables import BoardTables
+from .zobrist import ZobristKeys
 
 
 class Game:
@@ -21,65 +18,335 @@ class Game:
     - execute(move) : performs a move properly.
     This is the only correct way to perform a move
 
+    - undo() : takes back the last executed move
+
     - getStatus() : returns the status of the game (Enum class GameStatus)
 
-    - isOver() : True is the game is over (won or lost)
+    - isOver() : True is the game is over (won, lost or drawn)
+
+    - playerToMove() : the player whose turn it is
 
     - getCell(row, col) : only way to get a cell from a position
+
+    - legalMoves(player) : yields the moves the player can make
+
+    - validate_many(moves) : returns the Legality of each of the moves
+
+    - snapshot() : returns a frozen, read-only view of the position
+
+    The attribute hash holds a 64-bit Zobrist hash of the position
+    (pawns and side to move), updated incrementally by execute() and undo().
+    A position repeated REPETITION_LIMIT times is a draw, and a player
+    who cannot move when it is their turn has lost. The attacker moves
+    first and every execute() gives the turn to the other side.
+    The status of the game is also maintained by execute() and undo(),
+    so getStatus() and isOver() are simple lookups.
+    If the board is modified directly, call refreshState() afterwards.
     """
 
+    REPETITION_LIMIT = 3
+    # Board sizes for which populate() lays out a starting position
+    SIZES = (11,)
+
     def __init__(self, attackingPlayer, defendingPlayer, size=11):
         """Creates a game of the given size (width) with the two given players.
         Creates the board of cells and populates it with pawns."""
         self.width = size
+        self.tables = BoardTables.forSize(size)
         self.cells = Game.createCells(self.width)
         self.attackingPlayer = attackingPlayer
         self.defendingPlayer = defendingPlayer
         self.king = King(self.defendingPlayer)
         self.populate()
+        self.zobrist = ZobristKeys.forSize(self.width)
+        self._pendingSnapshot = None
+        self.refreshState()
+
+    def refreshState(self, attackerToMove=True):
+        """Recomputes the hash and status of the game from the board
+        and forgets the history. Only needed after modifying the board
+        without execute(), for instance to set up a position,
+        attackerToMove telling which side is to move in that position.
+        Snapshots taken but not yet copied (see snapshot()) get the new
+        position."""
+        if(self._pendingSnapshot is not None):
+            self._freeze()
+        self._legalMoves = {}
+        self.history = []
+        self.attackerToMove = attackerToMove
+        self.hash = self.zobrist.hashCells(self.cells)
+        if(not attackerToMove):
+            self.hash ^= self.zobrist.side
+        self._positionCounts = {self.hash: 1}
+        self._occupancy = tuple(self._occupancyRow(row)
+                                for row in range(len(self.cells)))
+        self._dirtyRows = set()
+        self._countKingBlockers()
+        self._updateStatus()
 
     def execute(self, move):
         """Performs the given move and all side effects.
-        This is the only correct way to execute a move."""
+        This is the only correct way to execute a move.
+        Returns a MoveRecord, also pushed on the history used by undo()."""
+        if(self._pendingSnapshot is not None):
+            self._freeze()
         move.do_unsafe()
-        potentiallyTaken = self.getNeighbouringCells(move.endCell)
+        self._legalMoves = {}
+        (row, col) = move.endCell.position
         potentialKiller = move.endCell.getPawn()
-        for cell in potentiallyTaken:
+        captured = []
+        for ((r, c), _) in self.tables.sandwiches[row][col]:
+            cell = self.cells[r][c]
             if cell.isOccupied():
                 potentialVictim = cell.getPawn()
                 if(self.isTakenBy(potentialVictim, potentialKiller)):
+                    captured.append((cell.takePawn(), cell))
+        record = MoveRecord(potentialKiller, move.startCell, move.endCell,
+                            captured)
+        self.history.append(record)
+        self._markDirty(record)
+        self.attackerToMove = not self.attackerToMove
+        self.hash ^= self._recordKey(record)
+        self._positionCounts[self.hash] = (
+            self._positionCounts.get(self.hash, 0) + 1)
+        self._updateKingBlockers(record)
+        self._updateStatus()
+        return record
+
+    def undo(self):
+        """Takes back the last executed move, putting back captured pawns.
+        Returns the MoveRecord of the move taken back.
+        Raises IndexError if no move has been executed."""
+        if(not self.history):
+            raise IndexError("No move to undo")
+        if(self._pendingSnapshot is not None):
+            self._freeze()
+        record = self.history.pop()
+        count = self._positionCounts[self.hash] - 1
+        if(count):
+            self._positionCounts[self.hash] = count
+        else:
+            del self._positionCounts[self.hash]
+        self.hash ^= self._recordKey(record)
+        record.endCell.takePawn()
+        record.startCell.placePawn(record.pawn)
+        for (pawn, cell) in record.captured:
+            cell.placePawn(pawn)
+        self._markDirty(record)
+        self.attackerToMove = not self.attackerToMove
+        self._legalMoves = {}
+        self._updateKingBlockers(record)
+        self._updateStatus()
+        return record
+
+    def _recordKey(self, record):
+        """Returns the value to XOR with the hash to apply
+        (or take back) the recorded move."""
+        keys = self.zobrist
+        key = (keys.side ^
+               keys.pawnKey(record.pawn, record.startCell) ^
+               keys.pawnKey(record.pawn, record.endCell))
+        for (pawn, cell) in record.captured:
+            key ^= keys.pawnKey(pawn, cell)
+        return key
+
+    def _markDirty(self, record):
+        "Marks the rows changed by the recorded move for snapshot()"
+        dirty = self._dirtyRows
+        dirty.add(record.startCell.position[0])
+        dirty.add(record.endCell.position[0])
+        for (_, cell) in record.captured:
+            dirty.add(cell.position[0])
+
+    def _occupancyRow(self, row):
+        "Returns the tuple of the pawn classes (or None) of a row of cells"
+        return tuple(None if cell.pawn is None else type(cell.pawn)
+                     for cell in self.cells[row])
+
+    def snapshot(self):
+        """Returns a GameSnapshot: a frozen, read-only view of the current
+        position, with the same read methods as Game (getCell, getStatus,
+        getNeighbouringCells...), unaffected by later moves.
+
+        Taking a snapshot is O(1), copy-on-write: the snapshot shares the
+        rows of the previous one, and the rows changed since then (a few
+        per move) are only copied at the next execute() or undo(), or at
+        the first read of the snapshot. Calls without a move in between
+        return the same snapshot."""
+        snapshot = self._pendingSnapshot
+        if(snapshot is None):
+            snapshot = GameSnapshot(self.width, self.attackingPlayer,
+                                    self.defendingPlayer, None, self._status,
+                                    self.hash, len(self.history),
+                                    self.attackerToMove, self)
+            self._pendingSnapshot = snapshot
+        return snapshot
+
+    def _freeze(self):
+        """Gives the pending snapshot its rows, copying the rows changed
+        since the previous snapshot"""
+        if(self._dirtyRows):
+            rows = list(self._occupancy)
+            for row in self._dirtyRows:
+                rows[row] = self._occupancyRow(row)
+            self._occupancy = tuple(rows)
+            self._dirtyRows.clear()
+        self._pendingSnapshot.freeze(self._occupancy)
+        self._pendingSnapshot = None
+
+    @staticmethod
+    def fromSnapshot(snapshot):
+        """Creates a Game in the position of the given snapshot
+        (without history, with the same hash), for instance to resume
+        analysis from it."""
+        game = Game(snapshot.attackingPlayer, snapshot.defendingPlayer,
+                    snapshot.width)
+        pawns = {Attacker: lambda: Attacker(game.attackingPlayer),
+                 Defender: lambda: Defender(game.defendingPlayer),
+                 King: lambda: game.king}
+        for row in game.cells:
+            for cell in row:
+                if(cell.isOccupied()):
                     cell.takePawn()
+        for (row, cells) in enumerate(game.cells):
+            for (col, cell) in enumerate(cells):
+                pawnType = snapshot.pawnTypeAt(row, col)
+                if(pawnType is not None):
+                    cell.placePawn(pawns[pawnType]())
+        game.refreshState(snapshot.attackerToMove)
+        return game
+
+    def _countKingBlockers(self):
+        "Counts the cells around the king which are blocking to it"
+        self._kingBlockers = sum(
+            1 for cell in self.getNeighbouringCells(self.king.cell)
+            if cell.isBlockingTo(self.king))
+
+    def _updateKingBlockers(self, record):
+        """Updates the count of cells blocking the king, if the recorded
+        move (executed or taken back) changed a cell around the king."""
+        if(record.pawn is self.king):
+            self._countKingBlockers()
+            return
+        (row, col) = self.king.cell.position
+        around = self.tables.neighbours[row][col]
+        changed = [record.startCell, record.endCell]
+        changed.extend(cell for (_, cell) in record.captured)
+        if(any(cell.position in around for cell in changed)):
+            self._countKingBlockers()
+
+    def _updateStatus(self):
+        kingCell = self.king.cell
+        (row, col) = kingCell.position
+        if(kingCell.type == CellType.CASTLE):
+            self._status = GameStatus.DEFENDER_WON
+        elif(self._kingBlockers == len(self.tables.neighbours[row][col])):
+            self._status = GameStatus.ATTACKER_WON
+        elif(not self._canMove(self.playerToMove())):
+            self._status = (GameStatus.DEFENDER_WON if self.attackerToMove
+                            else GameStatus.ATTACKER_WON)
+        elif(self._positionCounts[self.hash] >= Game.REPETITION_LIMIT):
+            self._status = GameStatus.DRAW
+        else:
+            self._status = GameStatus.IN_PROGRESS
+
+    def _canMove(self, player):
+        "Returns True if the player has at least one legal move"
+        moves = self._legalMoves.get(player)
+        if(moves is not None):
+            return bool(moves)
+        for row in self.cells:
+            for cell in row:
+                pawn = cell.pawn
+                if(pawn is not None and pawn.owner == player and
+                   next(self._reachableCells(cell), None) is not None):
+                    return True
+        return False
+
+    def playerToMove(self):
+        "Returns the player whose turn it is"
+        if(self.attackerToMove):
+            return self.attackingPlayer
+        return self.defendingPlayer
 
     def getStatus(self):
         "Returns the current status of the game (see Enum class GameStatus)"
-        if(self.king.cell.type == CellType.CASTLE):
-            return GameStatus.DEFENDER_WON
-        cellsAroundKing = self.getNeighbouringCells(self.king.cell)
-        if(all(cell.isBlockingTo(self.king) for cell in cellsAroundKing)):
-            return GameStatus.ATTACKER_WON
-        return GameStatus.IN_PROGRESS
+        return self._status
 
     def isOver(self):
-        "Returns True if the game is over (won or lost)"
-        return self.getStatus() in [GameStatus.ATTACKER_WON,
-                                    GameStatus.DEFENDER_WON]
+        "Returns True if the game is over (won, lost or drawn)"
+        return self._status is not GameStatus.IN_PROGRESS
 
     def getCell(self, rowIndex, colIndex):
         "Returns cell at the corresponding (row, column)"
         return self.cells[rowIndex][colIndex]
 
+    def legalMoves(self, player):
+        """Yields all the legal moves of the given player.
+        Moves are computed once per position and cached until the next
+        call to execute()."""
+        moves = self._legalMoves.get(player)
+        if(moves is None):
+            moves = list(self._generateMoves(player))
+            self._legalMoves[player] = moves
+        yield from moves
+
+    def _generateMoves(self, player):
+        """Yields legal moves by sliding each pawn of the player
+        along its rays (see BoardTables) until it is blocked."""
+        for row in self.cells:
+            for startCell in row:
+                pawn = startCell.pawn
+                if(pawn is None or pawn.owner != player):
+                    continue
+                for endCell in self._reachableCells(startCell):
+                    yield Move(startCell, endCell, self, player)
+
+    def _reachableCells(self, startCell):
+        """Yields the cells the pawn on startCell can move to,
+        sliding along its rays until it is blocked."""
+        cells = self.cells
+        pawn = startCell.pawn
+        (startRow, startCol) = startCell.position
+        for ray in self.tables.rays[startRow][startCol]:
+            for (r, c) in ray:
+                endCell = cells[r][c]
+                if(endCell.pawn is not None or not pawn.can_go_on(endCell)):
+                    break
+                yield endCell
+
+    def validate_many(self, moves):
+        """Returns the Legality of each of the given moves (see
+        Move.validate) in the current position, without exceptions.
+        The cells reachable from a start cell are looked up once for all
+        the moves from that cell; only illegal moves are checked one by one,
+        to find out why."""
+        reachable = {}
+        out = []
+        for move in moves:
+            startCell = move.startCell
+            pawn = startCell.pawn
+            if(pawn is not None and pawn.owner == move.player):
+                ends = reachable.get(startCell.position)
+                if(ends is None):
+                    ends = set(cell.position for cell
+                               in self._reachableCells(startCell))
+                    reachable[startCell.position] = ends
+                if(move.endCell.position in ends):
+                    out.append(Legality.LEGAL)
+                    continue
+            out.append(move.validate())
+        return out
+
     def _withinLimits(self, index):
-            return index >= 0 & index < self.width
+        return self.tables.withinLimits(index)
 
     def getNeighbouringCells(self, cell):
         """Returns the 4 directly neighbouring cells of the given cell.
         May return less than 4 cells if a border cell is given."""
         (row, col) = cell.position
-        neighbouringPos = [(row + 1, col), (row - 1, col),
-                           (row, col + 1), (row, col - 1)]
-        for (r, c) in neighbouringPos:
-            if(self._withinLimits(r) & self._withinLimits(c)):
-                yield self.getCell(r, c)
+        for (r, c) in self.tables.neighbours[row][col]:
+            yield self.cells[r][c]
 
     def isTakenBy(self, victim, killer):
         """Returns True if victim pawn is taken by killer pawn,
@@ -88,28 +355,13 @@ class Game:
         if(victim == self.king):
             return False
         (row, col) = victim.cell.position
-        nhood1 = [self.getCell(r, c)
-                  for (r, c) in [(row + 1, col), (row - 1, col)]
-                  if self._withinLimits(r) & self._withinLimits(c)]
-        nhood2 = [self.getCell(r, c)
-                  for (r, c) in [(row, col + 1), (row, col - 1)]
-                  if self._withinLimits(r) & self._withinLimits(c)]
-
-        def neighbourhoodIsBlocking(nhood):
-            return all(cell.isBlockingTo(victim) for cell in nhood)
-
-        def neighbourhoodContainsTarget(nhood):
-            def predicates():
-                for cell in nhood:
-                    if cell.isOccupied():
-                        yield(cell.getPawn() == killer)
-            return any(predicates())
-
-        def check(nhood):
-            return (neighbourhoodIsBlocking(nhood) &
-                    neighbourhoodContainsTarget(nhood))
-
-        return check(nhood1) | check(nhood2)
+        cells = self.cells
+        for pair in self.tables.pairs[row][col]:
+            nhood = [cells[r][c] for (r, c) in pair]
+            if(any(cell.pawn is killer for cell in nhood) and
+               all(cell.isBlockingTo(victim) for cell in nhood)):
+                return True
+        return False
 
     def populate(self):
         """Fills in the board with pawns in starting position"""
@@ -167,9 +419,10 @@ class Game:
         cells.append(castlerow())
         cells.append(wallrow())
 
+        positions = BoardTables.forSize(n).positions
         for i in range(n + 2):
             for j in range(n + 2):
-                cells[i][j].setPosition((i, j))
+                cells[i][j].setPosition(positions[i][j])
 
         return cells
 
@@ -1,4 +1,5 @@
-from .cell import CellException
+from enum import Enum
+from .tables import BoardTables
 
 
 class IllegalMoveException(Exception):
@@ -6,6 +7,54 @@ class IllegalMoveException(Exception):
     pass
 
 
+class Legality(Enum):
+    """Result of the validation of a move (see Move.validate):
+    LEGAL, or the reason why the move is not legal,
+    in the order the checks are made."""
+    LEGAL = 0
+    EMPTY_START = 1
+    FORBIDDEN_CELL = 2
+    WRONG_PLAYER = 3
+    NOT_STRAIGHT = 4
+    PATH_BLOCKED = 5
+    OCCUPIED_END = 6
+
+
+_MESSAGES = {
+    Legality.LEGAL: "Legal move",
+    Legality.EMPTY_START: "Cannot get pawn of empty cell",
+    Legality.NOT_STRAIGHT: "Move is not a straight line",
+    Legality.PATH_BLOCKED: "There are pawns on the path",
+    Legality.OCCUPIED_END: "Targeted cell is already occupied"
+}
+
+
+class MoveRecord:
+    """Record of a move performed by Game.execute(),
+    holding what Game.undo() needs to restore the previous position.
+
+    - pawn : the moved pawn
+    - startCell, endCell : the cells the pawn moved from and to
+    - captured : list of (pawn, cell) tuples for the pawns taken by the move
+    """
+
+    def __init__(self, pawn, startCell, endCell, captured):
+        self.pawn = pawn
+        self.startCell = startCell
+        self.endCell = endCell
+        self.captured = captured
+
+    def changedPositions(self):
+        "Returns the set of (row, col) positions of the cells the move changed"
+        changed = set([self.startCell.position, self.endCell.position])
+        changed.update(cell.position for (_, cell) in self.captured)
+        return changed
+
+    def __repr__(self):
+        return ("MoveRecord(pawn=%r, startCell=%r, endCell=%r, captured=%r)" %
+                (self.pawn, self.startCell, self.endCell, self.captured))
+
+
 class Move:
     """Class containing a pawn move.
 
@@ -15,6 +64,8 @@ class Move:
 
 
     Main public methods are:
+    - validate(self) : returns the Legality of the move (a reason code),
+    checking it once and without exceptions
     - isLegal(self) : returns a boolean indicating legeality of the move
     - whyNotLegal(self) : returns a string describing the legality of the move
     - do_unsafe(self) : should not be called!
@@ -34,70 +85,48 @@ class Move:
     def do_unsafe(self):
         """Should not be called - execute the move via game.execute(move)
         Raises IllegalMoveException is the move is not legal."""
-        if(not self.isLegal()):
-            raise IllegalMoveException(self.whyNotLegal())
+        legality = self.validate()
+        if(legality is not Legality.LEGAL):
+            raise IllegalMoveException(self.describe(legality))
         pawn = self.startCell.takePawn()
         self.endCell.placePawn(pawn)
 
-    def _checkCells(self):
-        """Check that start cell contains a pawn and end cell is free.
-        Raises IllegalMoveException otherwise."""
-        if(self.startCell.isEmpty()):
-            raise IllegalMoveException("No pawn in start cell")
-        if(self.endCell.isOccupied()):
-            raise IllegalMoveException("Targeted cell is already occupied")
-        return True
-
-    def _checkPawn(self):
-        """Check that the moved pawn can be moved to the target cell.
-        Raises IllegalMoveException otherwise."""
-        pawn = self.startCell.getPawn()
+    def validate(self):
+        """Checks the move once, without raising exceptions, and returns
+        its Legality: LEGAL or the reason why the move is not legal."""
+        pawn = self.startCell.pawn
+        if(pawn is None):
+            return Legality.EMPTY_START
         if(not pawn.can_go_on(self.endCell)):
-            message = ("This pawn (%r) cannot go on this type of cell (%r)" %
-                       (pawn, self.endCell.type))
-            raise IllegalMoveException(message)
-        return True
-
-    def _checkPlayer(self):
-        """Check that the player is authorised to move the pawn.
-        Raises IllegalMoveException otherwise."""
-        pawn = self.startCell.getPawn()
+            return Legality.FORBIDDEN_CELL
         if(not pawn.owner == self.player):
-            message = ("Player (%r) is not allowed to move that pawn (%r)" %
-                       (self.player, pawn))
-            raise IllegalMoveException(message)
-
-    def _checkPath(self):
-        """Check that move spans a straight and unobstructed path.
-        Raises IllegalMoveException otherwise."""
+            return Legality.WRONG_PLAYER
         if(not self._isStraightLine()):
-            raise IllegalMoveException("Move is not a straight line")
-        path = self._getPath()
-        if(any(cell.isOccupied() for cell in path)):
-            raise IllegalMoveException("There are pawns on the path")
-        return True
-
-    def _getLegalityStatus(self):
-        """Returns a tuple (bool, description)
-        where bool is True if the move is legal
-        and description is a string describing the legality"""
-        try:
-            self._checkPawn()
-            self._checkPlayer()
-            self._checkPath()
-            self._checkCells()
-        except (IllegalMoveException, CellException) as errorMessage:
-            return (False, errorMessage)
-        return (True, "Legal move")
+            return Legality.NOT_STRAIGHT
+        if(any(cell.pawn is not None for cell in self._getPath())):
+            return Legality.PATH_BLOCKED
+        if(self.endCell.pawn is not None):
+            return Legality.OCCUPIED_END
+        return Legality.LEGAL
+
+    def describe(self, legality):
+        "Returns the message describing the given Legality of the move"
+        if(legality is Legality.FORBIDDEN_CELL):
+            return ("This pawn (%r) cannot go on this type of cell (%r)" %
+                    (self.startCell.pawn, self.endCell.type))
+        if(legality is Legality.WRONG_PLAYER):
+            return ("Player (%r) is not allowed to move that pawn (%r)" %
+                    (self.player, self.startCell.pawn))
+        return _MESSAGES[legality]
 
     def isLegal(self):
         "Returns True if move is legal, False otherwise."
-        return self._getLegalityStatus()[0]
+        return self.validate() is Legality.LEGAL
 
     def whyNotLegal(self):
         """Returns a string describing the legality status.
         Useful for error messages."""
-        return self._getLegalityStatus()[1]
+        return self.describe(self.validate())
 
     def __str__(self):
         return str(self.startCell) + "->" + str(self.endCell)
@@ -118,13 +147,14 @@ class Move:
         start and end cells excluded"""
         (startRow, startCol) = self.startCell.position
         (endRow, endCol) = self.endCell.position
+        rays = BoardTables.forSize(self.game.width).rays[startRow][startCol]
         if(startRow - endRow == 0):
-            for col in range(min(endCol, startCol) + 1,
-                             max(endCol, startCol)):
-                yield self.game.getCell(startRow, col)
+            distance = endCol - startCol
+            ray = rays[2] if distance > 0 else rays[3]
         elif(startCol - endCol == 0):
-            for row in range(min(startRow, endRow) + 1,
-                             max(startRow, endRow)):
-                yield self.game.getCell(row, startCol)
+            distance = endRow - startRow
+            ray = rays[0] if distance > 0 else rays[1]
         else:
             raise ValueError("Move is not straight line")
+        for (row, col) in ray[:max(abs(distance) - 1, 0)]:
+            yield self.game.getCell(row, col)
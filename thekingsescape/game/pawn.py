@@ -2,6 +2,8 @@ from .cell import CellType
 
 
 class Pawn:
+    __slots__ = ('owner', 'cell')
+
     def __init__(self, player):
         self.owner = player
         self.cell = None
@@ -23,6 +25,8 @@ class Pawn:
 
 
 class Attacker(Pawn):
+    __slots__ = ()
+
     def __str__(self):
         return '♂'
 
@@ -31,6 +35,8 @@ class Attacker(Pawn):
 
 
 class Defender(Pawn):
+    __slots__ = ()
+
     def __str__(self):
         return '♀'
 
@@ -39,6 +45,8 @@ class Defender(Pawn):
 
 
 class King(Pawn):
+    __slots__ = ()
+
     def can_go_on(self, cell):
         return cell.type in [CellType.NORMAL, CellType.CASTLE]
 
@@ -7,3 +7,37 @@ class Player:
 
     def __repr__(self):
         return "Player(name=%r)" % self.name
+
+
+class ComputerPlayer(Player):
+    """Base class for players whose moves are chosen by the program.
+
+    Controllers ask a computer player for its move instead of reading input.
+    The main method to implement is chooseMove(self, game).
+
+    An opening book (see OpeningBook) and an endgame tablebase (see
+    Tablebase) can be given, in which case implementations should play
+    bookMove(game) when there is one.
+    """
+
+    def __init__(self, name, book=None, tablebase=None):
+        super().__init__(name)
+        self.book = book
+        self.tablebase = tablebase
+
+    def bookMove(self, game):
+        "Returns the opening book or tablebase move for the game, or None"
+        for source in [self.book, self.tablebase]:
+            if(source is not None):
+                move = source.bestMove(game, self)
+                if(move is not None):
+                    return move
+        return None
+
+    def chooseMove(self, game):
+        """Returns the move to play in the given game,
+        one of game.legalMoves(self)."""
+        raise NotImplementedError("A concrete computer player should be used.")
+
+    def __repr__(self):
+        return "%s(name=%r)" % (type(self).__name__, self.name)
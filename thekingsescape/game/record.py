@@ -0,0 +1,240 @@
+import struct
+from .game import Game, GameStatus
+from .move import Move
+from .player import Player
+
+MAGIC = b"TKR"
+VERSION = 1
+FLAG_CLOCK = 1
+END_OF_STREAM = None
+
+_HEADER = struct.Struct(">3sBBBBH")
+_MOVE = struct.Struct(">BB")
+_MOVE_CLOCK = struct.Struct(">BBI")
+
+
+class RecordException(Exception):
+    """Raised when reading a malformed game record"""
+    pass
+
+
+class GameRecord:
+    """Record of a played game, for storage in the binary record format.
+
+    - size : width of the board
+    - attackerName, defenderName : names of the players
+    - result : GameStatus at the end of the game
+    - moves : list of ((row, col), (row, col)) start and end positions,
+    the attacker playing first
+    - clocks : optional list with the time taken by each move,
+    in milliseconds
+
+    Binary layout of a record (big-endian), records being concatenated
+    in a file or stream:
+    magic "TKR", version, board size, flags (1: clocks), result,
+    number of moves (2 bytes), attacker and defender names (1 byte length
+    followed by UTF-8), then per move the start and end squares (1 byte each,
+    (row - 1) * size + (col - 1)), followed by the clock (4 bytes) if any.
+    """
+
+    def __init__(self, size, attackerName, defenderName, result,
+                 moves, clocks=None):
+        if(size * size > 255):
+            raise ValueError("Board too large for the record format")
+        self.size = size
+        self.attackerName = attackerName
+        self.defenderName = defenderName
+        self.result = result
+        self.moves = moves
+        self.clocks = clocks
+
+    @staticmethod
+    def fromGame(game, clocks=None):
+        "Returns the record of the moves executed so far in the given game"
+        moves = [(record.startCell.position, record.endCell.position)
+                 for record in game.history]
+        return GameRecord(game.width, str(game.attackingPlayer),
+                          str(game.defendingPlayer), game.getStatus(),
+                          moves, clocks)
+
+    def toBytes(self):
+        "Returns the binary encoding of the record"
+        attacker = self.attackerName.encode("utf-8")
+        defender = self.defenderName.encode("utf-8")
+        flags = FLAG_CLOCK if self.clocks is not None else 0
+        parts = [_HEADER.pack(MAGIC, VERSION, self.size, flags,
+                              self.result.value, len(self.moves)),
+                 bytes([len(attacker)]), attacker,
+                 bytes([len(defender)]), defender]
+        n = self.size
+        for (i, (start, end)) in enumerate(self.moves):
+            squares = ((start[0] - 1) * n + start[1] - 1,
+                       (end[0] - 1) * n + end[1] - 1)
+            if(self.clocks is None):
+                parts.append(_MOVE.pack(*squares))
+            else:
+                parts.append(_MOVE_CLOCK.pack(squares[0], squares[1],
+                                              self.clocks[i]))
+        return b"".join(parts)
+
+    def replay(self, gameClass=Game):
+        """Yields the game after each move, replayed through execute().
+        See replayMoves."""
+        return replayMoves(self.size, self.attackerName, self.defenderName,
+                           self.moves, gameClass)
+
+    def __repr__(self):
+        return ("GameRecord(size=%r, attackerName=%r, defenderName=%r, "
+                "result=%r, moves=<%d moves>)" %
+                (self.size, self.attackerName, self.defenderName,
+                 self.result, len(self.moves)))
+
+
+class RecordWriter:
+    """Writes game records one after the other to a binary stream."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.count = 0
+
+    def write(self, record):
+        "Appends a GameRecord to the stream"
+        self.stream.write(record.toBytes())
+        self.count += 1
+
+    def writeGame(self, game, clocks=None):
+        "Appends the record of the given game to the stream"
+        self.write(GameRecord.fromGame(game, clocks))
+
+    def __repr__(self):
+        return "RecordWriter(stream=%r)" % self.stream
+
+
+class RecordEntry:
+    """Game record being read from a stream by a RecordReader.
+
+    The header fields (size, attackerName, defenderName, result, moveCount,
+    hasClock) are read at once; moves are only read from the stream when
+    iterating over moves(), and skipped when the reader moves on to the
+    next record. An entry is only readable until then.
+    """
+
+    def __init__(self, reader, size, attackerName, defenderName, result,
+                 moveCount, hasClock):
+        self._reader = reader
+        self.size = size
+        self.attackerName = attackerName
+        self.defenderName = defenderName
+        self.result = result
+        self.moveCount = moveCount
+        self.hasClock = hasClock
+        self._remaining = moveCount
+
+    def moves(self):
+        """Yields (start, end, clock) tuples, where start and end are
+        (row, col) positions and clock is the time in milliseconds taken by
+        the move, or None if the record has no clocks."""
+        moveStruct = _MOVE_CLOCK if self.hasClock else _MOVE
+        n = self.size
+        while(self._remaining):
+            data = self._reader._read(moveStruct.size)
+            self._remaining -= 1
+            fields = moveStruct.unpack(data)
+            start = divmod(fields[0], n)
+            end = divmod(fields[1], n)
+            clock = fields[2] if self.hasClock else None
+            yield ((start[0] + 1, start[1] + 1), (end[0] + 1, end[1] + 1),
+                   clock)
+
+    def read(self):
+        "Reads the remaining moves and returns the whole GameRecord"
+        moves = []
+        clocks = [] if self.hasClock else None
+        for (start, end, clock) in self.moves():
+            moves.append((start, end))
+            if(clocks is not None):
+                clocks.append(clock)
+        return GameRecord(self.size, self.attackerName, self.defenderName,
+                          self.result, moves, clocks)
+
+    def replay(self, gameClass=Game):
+        """Yields the game after each move read from the stream,
+        replayed through execute(). See replayMoves."""
+        moves = ((start, end) for (start, end, _) in self.moves())
+        return replayMoves(self.size, self.attackerName, self.defenderName,
+                           moves, gameClass)
+
+    def _skip(self):
+        moveSize = (_MOVE_CLOCK if self.hasClock else _MOVE).size
+        self._reader._read(self._remaining * moveSize)
+        self._remaining = 0
+
+    def __repr__(self):
+        return ("RecordEntry(size=%r, attackerName=%r, defenderName=%r, "
+                "result=%r, moveCount=%r)" %
+                (self.size, self.attackerName, self.defenderName,
+                 self.result, self.moveCount))
+
+
+class RecordReader:
+    """Reads game records lazily from a binary stream.
+
+    Iterating over the reader yields a RecordEntry per game;
+    its moves are only read if asked for.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def _read(self, size):
+        data = self.stream.read(size)
+        if(len(data) != size):
+            raise RecordException("Truncated game record")
+        return data
+
+    def readEntry(self):
+        """Reads the header of the next record and returns its RecordEntry,
+        or None at the end of the stream.
+        Moves of the previous entry must have been read or skipped."""
+        data = self.stream.read(_HEADER.size)
+        if(not data):
+            return END_OF_STREAM
+        if(len(data) != _HEADER.size):
+            raise RecordException("Truncated game record")
+        (magic, version, size, flags, result, moveCount) = _HEADER.unpack(data)
+        if(magic != MAGIC or version != VERSION):
+            raise RecordException("Not a game record (version %r)" % version)
+        names = []
+        for _ in range(2):
+            length = self._read(1)[0]
+            names.append(self._read(length).decode("utf-8"))
+        return RecordEntry(self, size, names[0], names[1],
+                           GameStatus(result), moveCount,
+                           bool(flags & FLAG_CLOCK))
+
+    def __iter__(self):
+        while(True):
+            entry = self.readEntry()
+            if(entry is END_OF_STREAM):
+                return
+            yield entry
+            entry._skip()
+
+    def __repr__(self):
+        return "RecordReader(stream=%r)" % self.stream
+
+
+def replayMoves(size, attackerName, defenderName, moves, gameClass=Game):
+    """Plays the given (start, end) moves from the starting position,
+    through execute() of a new game of the given class, attacker first.
+    Yields the game after each move (the same, updated, game object).
+    Raises IllegalMoveException if a move is not legal."""
+    attacker = Player(attackerName)
+    defender = Player(defenderName)
+    game = gameClass(attacker, defender, size)
+    players = (attacker, defender)
+    for (i, (start, end)) in enumerate(moves):
+        move = Move(game.getCell(*start), game.getCell(*end), game,
+                    players[i % 2])
+        game.execute(move)
+        yield game
@@ -0,0 +1,124 @@
+from .cell import Cell, CellType
+from .pawn import Attacker
+from .status import GameStatus
+from .tables import BoardTables
+
+
+class GameSnapshot:
+    """Frozen, read-only view of a Game position, returned by Game.snapshot().
+
+    The position is held as a tuple of rows, each a tuple with the pawn
+    class (or None) of every cell. Rows unchanged between snapshots are
+    shared, and the rows of a new snapshot are only copied from its game
+    when the game is next modified or the snapshot first read (see
+    Game.snapshot), so that a snapshot is unaffected by later moves.
+
+    Cells are only materialized (as Cell and Pawn objects, not linked to
+    the game) when accessed through getCell(), getNeighbouringCells()
+    or cells. pawnTypeAt() reads the position without materializing cells.
+    Snapshots are small and picklable, to be handed to analysis workers.
+    """
+
+    __slots__ = ('width', 'attackingPlayer', 'defendingPlayer', 'hash',
+                 'moveCount', 'attackerToMove', 'tables', '_rows', '_status',
+                 '_cells', '_game')
+
+    def __init__(self, width, attackingPlayer, defendingPlayer, rows, status,
+                 positionHash, moveCount, attackerToMove=True, game=None):
+        """Creates a snapshot from its rows, or from the game which will
+        give them later through freeze() if rows is None."""
+        self.width = width
+        self.attackingPlayer = attackingPlayer
+        self.defendingPlayer = defendingPlayer
+        self.hash = positionHash
+        self.moveCount = moveCount
+        self.attackerToMove = attackerToMove
+        self.tables = BoardTables.forSize(width)
+        self._rows = rows
+        self._status = status
+        self._cells = {}
+        self._game = game
+
+    def freeze(self, rows):
+        "Sets the rows of the snapshot, given by its game"
+        self._rows = rows
+        self._game = None
+
+    def _getRows(self):
+        if(self._rows is None):
+            self._game._freeze()
+        return self._rows
+
+    def __getstate__(self):
+        return (self.width, self.attackingPlayer, self.defendingPlayer,
+                self._getRows(), self._status, self.hash, self.moveCount,
+                self.attackerToMove)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def getStatus(self):
+        "Returns the status of the game when the snapshot was taken"
+        return self._status
+
+    def isOver(self):
+        "Returns True if the game was over (won, lost or drawn)"
+        return self._status is not GameStatus.IN_PROGRESS
+
+    def playerToMove(self):
+        "Returns the player whose turn it was"
+        if(self.attackerToMove):
+            return self.attackingPlayer
+        return self.defendingPlayer
+
+    def pawnTypeAt(self, rowIndex, colIndex):
+        "Returns the class of the pawn at (row, column), or None"
+        return self._getRows()[rowIndex][colIndex]
+
+    def getCell(self, rowIndex, colIndex):
+        """Returns a cell at the corresponding (row, column), materialized
+        on first access (the same object afterwards).
+        Raises IndexError outside of the board, like Game.getCell."""
+        pawnType = self._getRows()[rowIndex][colIndex]
+        position = self.tables.positions[rowIndex][colIndex]
+        cell = self._cells.get(position)
+        if(cell is None):
+            cell = Cell(cellType(self.width, *position))
+            cell.setPosition(position)
+            if(pawnType is not None):
+                owner = (self.attackingPlayer if pawnType is Attacker
+                         else self.defendingPlayer)
+                cell.placePawn(pawnType(owner))
+            self._cells[position] = cell
+        return cell
+
+    @property
+    def cells(self):
+        "2D list of all the (materialized) cells, as Game.cells"
+        limit = self.width + 2
+        return [[self.getCell(row, col) for col in range(limit)]
+                for row in range(limit)]
+
+    def getNeighbouringCells(self, cell):
+        """Returns the 4 directly neighbouring cells of the given cell.
+        May return less than 4 cells if a border cell is given."""
+        (row, col) = cell.position
+        for (r, c) in self.tables.neighbours[row][col]:
+            yield self.getCell(r, c)
+
+    def __repr__(self):
+        return ("GameSnapshot(attackingPlayer=%r, defendingPlayer=%r, "
+                "size=%r, moveCount=%r)" %
+                (self.attackingPlayer, self.defendingPlayer, self.width,
+                 self.moveCount))
+
+
+def cellType(size, row, col):
+    "Returns the CellType at (row, col), as laid out by Game.createCells"
+    if(col in [0, size + 1]):
+        return CellType.VWALL
+    if(row in [0, size + 1]):
+        return CellType.HWALL
+    if(row in [1, size] and col in [1, size]):
+        return CellType.CASTLE
+    return CellType.NORMAL
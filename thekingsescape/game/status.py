@@ -0,0 +1,8 @@
+from enum import Enum
+
+
+class GameStatus(Enum):
+    IN_PROGRESS = 1
+    DEFENDER_WON = 2
+    ATTACKER_WON = 3
+    DRAW = 4
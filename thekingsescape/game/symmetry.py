@@ -0,0 +1,138 @@
+from .bitboard import BitboardTables, _bits
+from .zobrist import ZobristKeys
+
+IDENTITY = 0
+SYMMETRIES = range(8)
+
+_SWAP = 4
+_FLIP_ROWS = 2
+_FLIP_COLS = 1
+
+
+def transform(position, symmetry, size):
+    """Returns the (row, col) position mapped by the given symmetry of a
+    board of the given size (walls included in the coordinates).
+
+    The 8 symmetries of the square are numbered 0 to 7: bit 4 swaps rows
+    and columns (transposition), then bit 2 mirrors the rows and bit 1
+    the columns. 0 is the identity."""
+    (row, col) = position
+    if(symmetry & _SWAP):
+        (row, col) = (col, row)
+    if(symmetry & _FLIP_ROWS):
+        row = size + 1 - row
+    if(symmetry & _FLIP_COLS):
+        col = size + 1 - col
+    return (row, col)
+
+
+def inverse(symmetry):
+    "Returns the symmetry undoing the given one"
+    if(symmetry & _SWAP):
+        return (_SWAP | ((symmetry & _FLIP_ROWS) >> 1) |
+                ((symmetry & _FLIP_COLS) << 1))
+    return symmetry
+
+
+def transformMove(move, symmetry, size):
+    "Maps a ((row, col), (row, col)) move by the given symmetry"
+    (start, end) = move
+    return (transform(start, symmetry, size), transform(end, symmetry, size))
+
+
+class SymmetryTables:
+    """Square permutations of the 8 symmetries for boards of a given size.
+
+    squares[symmetry][i] is the index of the square square i is mapped to,
+    squares being indexed as in BitboardGame and ZobristKeys.
+    Use SymmetryTables.forSize(size) rather than the constructor.
+    """
+
+    _cache = {}
+
+    def __init__(self, size):
+        self.width = size
+        tables = BitboardTables.forSize(size)
+        self.squares = []
+        for symmetry in SYMMETRIES:
+            permutation = []
+            for index in range(tables.squares):
+                (row, col) = tables.position(index)
+                permutation.append(tables.index(
+                    *transform((row, col), symmetry, size)))
+            self.squares.append(permutation)
+
+    @staticmethod
+    def forSize(size):
+        "Returns the (cached) tables for boards of the given size"
+        tables = SymmetryTables._cache.get(size)
+        if(tables is None):
+            tables = SymmetryTables(size)
+            SymmetryTables._cache[size] = tables
+        return tables
+
+    def transformMask(self, mask, symmetry):
+        "Maps a bitboard mask by the given symmetry"
+        permutation = self.squares[symmetry]
+        out = 0
+        for index in _bits(mask):
+            out |= 1 << permutation[index]
+        return out
+
+    def __repr__(self):
+        return "SymmetryTables(size=%r)" % self.width
+
+
+def _pawnHashes(game):
+    """Returns (hashes, side) where hashes are the Zobrist hashes of the
+    pawns of the 8 symmetric images of the game position, indexed by
+    symmetry, and side the key of the side to move (or 0)."""
+    size = game.width
+    keys = ZobristKeys.forSize(size)
+    permutations = SymmetryTables.forSize(size).squares
+    stride = size + 2
+    hashes = [0] * 8
+    for row in game.cells:
+        for cell in row:
+            pawn = cell.pawn
+            if(pawn is None):
+                continue
+            (r, c) = cell.position
+            index = r * stride + c
+            pawnKeys = keys.pawnKeys[type(pawn)]
+            for symmetry in SYMMETRIES:
+                hashes[symmetry] ^= pawnKeys[permutations[symmetry][index]]
+    return (hashes, game.hash ^ hashes[IDENTITY])
+
+
+def symmetricHashes(game):
+    """Returns the Zobrist hashes (see Game.hash) of the 8 symmetric
+    images of the game position, indexed by symmetry: hashes[symmetry] is
+    the hash the game would have after mapping all its pawns with
+    transform(..., symmetry, size)."""
+    (hashes, side) = _pawnHashes(game)
+    return [h ^ side for h in hashes]
+
+
+def canonicalHash(game):
+    """Returns (hash, symmetry) where hash is the smallest Zobrist hash
+    (see Game.hash) of the 8 symmetric images of the game position,
+    the same for all of them, and symmetry maps the game to that image:
+    positions and moves of the game are mapped to the canonical frame
+    with transform(..., symmetry, size) and back with inverse(symmetry)."""
+    (hashes, side) = _pawnHashes(game)
+    best = min(SYMMETRIES, key=hashes.__getitem__)
+    return (hashes[best] ^ side, best)
+
+
+def canonicalPosition(position):
+    """Returns (canonical, symmetry) for a BitboardGame position (see
+    BitboardGame.position): canonical is the smallest of the 8 symmetric
+    images of the position, and symmetry maps the position to it."""
+    (size, attackers, defenders, king) = position
+    tables = SymmetryTables.forSize(size)
+    images = [((size, tables.transformMask(attackers, symmetry),
+                tables.transformMask(defenders, symmetry),
+                tables.transformMask(king, symmetry)), symmetry)
+              for symmetry in SYMMETRIES]
+    return min(images)
@@ -0,0 +1,99 @@
+DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+
+
+class BoardTables:
+    """Lookup tables for boards of a given size (width),
+    computed once and shared by all games of that size.
+
+    All tables are 2D lists indexed by [row][col] over the whole board,
+    walls included, and hold (row, col) positions:
+
+    - neighbours : the (up to 4) neighbouring positions on the board
+
+    - pairs : the pairs of opposite neighbours (vertical, then horizontal)
+    which must both block a pawn for it to be taken
+
+    - sandwiches : (victim, beyond) tuples, one per direction, where victim
+    is the neighbour and beyond the position behind it. A pawn moving on the
+    cell takes the victim when the beyond cell blocks it.
+
+    - rays : for each of the 4 DIRECTIONS, the playable positions
+    from the cell (excluded) to the border
+
+    Use BoardTables.forSize(size) rather than the constructor.
+    """
+
+    _cache = {}
+
+    def __init__(self, size):
+        self.width = size
+        self.limit = size + 2
+        span = range(self.limit)
+        self.positions = [[(row, col) for col in span] for row in span]
+        self.neighbours = [[self._neighbours(row, col) for col in span]
+                           for row in span]
+        self.pairs = [[self._pairs(row, col) for col in span]
+                      for row in span]
+        self.sandwiches = [[self._sandwiches(row, col) for col in span]
+                           for row in span]
+        self.rays = [[self._rays(row, col) for col in span] for row in span]
+
+    @staticmethod
+    def forSize(size):
+        "Returns the (cached) tables for boards of the given size"
+        tables = BoardTables._cache.get(size)
+        if(tables is None):
+            tables = BoardTables(size)
+            BoardTables._cache[size] = tables
+        return tables
+
+    def withinLimits(self, index):
+        "Returns True if index is a valid row or column index of the board"
+        return 0 <= index < self.limit
+
+    def isPlayable(self, row, col):
+        "Returns True if (row, col) is inside the walls"
+        return 1 <= row <= self.width and 1 <= col <= self.width
+
+    def _position(self, row, col):
+        if(self.withinLimits(row) and self.withinLimits(col)):
+            return self.positions[row][col]
+        return None
+
+    def _neighbours(self, row, col):
+        around = [self._position(row + dr, col + dc)
+                  for (dr, dc) in DIRECTIONS]
+        return tuple(pos for pos in around if pos is not None)
+
+    def _pairs(self, row, col):
+        pairs = []
+        for ((dr1, dc1), (dr2, dc2)) in [DIRECTIONS[0:2], DIRECTIONS[2:4]]:
+            pair = tuple(pos for pos in [self._position(row + dr1, col + dc1),
+                                         self._position(row + dr2, col + dc2)]
+                         if pos is not None)
+            pairs.append(pair)
+        return tuple(pairs)
+
+    def _sandwiches(self, row, col):
+        out = []
+        for (dr, dc) in DIRECTIONS:
+            victim = self._position(row + dr, col + dc)
+            beyond = self._position(row + 2 * dr, col + 2 * dc)
+            if(victim is not None and beyond is not None and
+               self.isPlayable(*victim)):
+                out.append((victim, beyond))
+        return tuple(out)
+
+    def _rays(self, row, col):
+        rays = []
+        for (dr, dc) in DIRECTIONS:
+            ray = []
+            (r, c) = (row + dr, col + dc)
+            while(self.isPlayable(r, c)):
+                ray.append(self.positions[r][c])
+                (r, c) = (r + dr, c + dc)
+            rays.append(tuple(ray))
+        return tuple(rays)
+
+    def __repr__(self):
+        return "BoardTables(size=%r)" % self.width
@@ -0,0 +1,52 @@
+import random
+from .pawn import Attacker, Defender, King
+
+
+class ZobristKeys:
+    """Random 64-bit keys used to hash positions (Zobrist hashing).
+
+    There is one key per (pawn type, square) plus one for the side to move.
+    The hash of a position is the XOR of the keys of all pawns on the board,
+    XORed with the side key when the defender is to move, so it can be
+    updated incrementally when a pawn moves or is taken.
+
+    Squares are indexed as row * (size + 2) + col, as in BitboardGame.
+    Keys are drawn from a generator seeded with the board size, so hashes
+    are stable across processes and runs.
+    Use ZobristKeys.forSize(size) rather than the constructor.
+    """
+
+    _cache = {}
+
+    def __init__(self, size):
+        self.stride = size + 2
+        rng = random.Random(size)
+        squares = self.stride * self.stride
+        self.pawnKeys = {}
+        for pawnType in [Attacker, Defender, King]:
+            self.pawnKeys[pawnType] = [rng.getrandbits(64)
+                                       for _ in range(squares)]
+        self.side = rng.getrandbits(64)
+
+    @staticmethod
+    def forSize(size):
+        "Returns the (cached) keys for boards of the given size"
+        keys = ZobristKeys._cache.get(size)
+        if(keys is None):
+            keys = ZobristKeys(size)
+            ZobristKeys._cache[size] = keys
+        return keys
+
+    def pawnKey(self, pawn, cell):
+        "Returns the key of the given pawn standing on the given cell"
+        (row, col) = cell.position
+        return self.pawnKeys[type(pawn)][row * self.stride + col]
+
+    def hashCells(self, cells):
+        "Returns the hash of the pawns on a 2D list of cells"
+        h = 0
+        for row in cells:
+            for cell in row:
+                if(cell.isOccupied()):
+                    h ^= self.pawnKey(cell.getPawn(), cell)
+        return h
@@ -0,0 +1,252 @@
+import functools
+import threading
+import time
+from bisect import bisect_left
+from .game.game import Game
+from .game.move import Move
+from .text_app.view import AbstractView
+
+# Upper bounds (seconds) of the latency buckets, the last bucket being
+# everything above 1s.
+LATENCY_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4,
+                   5e-4, 1e-3, 2.5e-3, 1e-2, 1e-1, 1.0)
+CAPTURE_BUCKETS = (0, 1, 2, 3)
+
+PREFIX = "thekingsescape_"
+
+
+class Histogram:
+    """Counts of observed values per bucket, with their total.
+    bounds are the increasing upper bounds of the buckets (inclusive),
+    followed by an implicit unbounded bucket."""
+
+    __slots__ = ('bounds', 'counts', 'count', 'sum')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.clear()
+
+    def clear(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        "Returns the [(bound, count of values <= bound)] of the buckets"
+        out = []
+        total = 0
+        for (bound, count) in zip(self.bounds + (float("inf"),),
+                                  self.counts):
+            total += count
+            out.append((bound, total))
+        return out
+
+    def __repr__(self):
+        return "Histogram(count=%r, sum=%r)" % (self.count, self.sum)
+
+
+def _viewClasses(cls=AbstractView):
+    "Yields the (imported) subclasses of AbstractView defining render()"
+    for subclass in cls.__subclasses__():
+        if('render' in subclass.__dict__):
+            yield subclass
+        yield from _viewClasses(subclass)
+
+
+class Instrumentation:
+    """Optional instrumentation of the hot paths of the game core.
+
+    When enabled, Game.execute, Game.isTakenBy, Game.getStatus,
+    Move.validate (behind isLegal, whyNotLegal and do_unsafe) and the
+    render() method of the views are replaced on their classes by
+    wrappers counting the calls and recording their latencies in
+    histograms; execute() also records the number of pawns captured per
+    move. Disabling puts the original methods back, so instrumentation
+    costs nothing at all when disabled. Only the views imported when
+    enable() is called are instrumented.
+
+    Main methods:
+
+    - enable() / disable() : installs or removes the wrappers
+
+    - snapshot() : returns the metrics as a dict (JSON serializable)
+
+    - prometheus() : returns the metrics in the Prometheus text format
+
+    - report() : returns a human readable summary
+
+    - reset() : clears the metrics
+
+    Use the module instance, instrumentation, which the web app exports.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.latencies = {}
+        self.captures = Histogram(CAPTURE_BUCKETS)
+        self._originals = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self._originals)
+
+    def _targets(self):
+        targets = [(Game, 'execute'), (Game, 'isTakenBy'),
+                   (Game, 'getStatus'), (Move, 'validate')]
+        targets.extend((cls, 'render') for cls in _viewClasses())
+        return targets
+
+    def enable(self):
+        "Installs the wrappers (no-op if already enabled)"
+        if(self.enabled):
+            return
+        for (cls, name) in self._targets():
+            original = cls.__dict__[name]
+            self._originals[(cls, name)] = original
+            qualifiedName = "%s.%s" % (cls.__name__, name)
+            if((cls, name) == (Game, 'execute')):
+                wrapper = self._execute(qualifiedName, original)
+            else:
+                wrapper = self._timed(qualifiedName, original)
+            setattr(cls, name, wrapper)
+
+    def disable(self):
+        "Puts the original methods back (metrics are kept)"
+        for ((cls, name), original) in self._originals.items():
+            setattr(cls, name, original)
+        self._originals = {}
+
+    def reset(self):
+        "Clears all the metrics"
+        with self._lock:
+            for histogram in self.latencies.values():
+                histogram.clear()
+            self.captures.clear()
+
+    def _histogram(self, name):
+        histogram = self.latencies.get(name)
+        if(histogram is None):
+            histogram = Histogram(LATENCY_BUCKETS)
+            self.latencies[name] = histogram
+        return histogram
+
+    def _timed(self, name, function):
+        histogram = self._histogram(name)
+        clock = self.clock
+        lock = self._lock
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                with lock:
+                    histogram.observe(elapsed)
+        return timed
+
+    def _execute(self, name, function):
+        histogram = self._histogram(name)
+        captures = self.captures
+        clock = self.clock
+        lock = self._lock
+
+        @functools.wraps(function)
+        def execute(game, move):
+            start = clock()
+            record = function(game, move)
+            elapsed = clock() - start
+            with lock:
+                histogram.observe(elapsed)
+                captures.observe(len(record.captured))
+            return record
+        return execute
+
+    def snapshot(self):
+        """Returns the metrics as a dict: for each instrumented function,
+        the number of calls, the total and mean latencies (seconds) and
+        the cumulative bucket counts; and the histogram of the captures
+        per move."""
+        with self._lock:
+            functions = {}
+            for (name, histogram) in sorted(self.latencies.items()):
+                functions[name] = {
+                    "calls": histogram.count,
+                    "seconds": histogram.sum,
+                    "meanSeconds": (histogram.sum / histogram.count
+                                    if histogram.count else 0.0),
+                    "buckets": [[_bound(bound), count] for (bound, count)
+                                in histogram.cumulative()]}
+            captures = {
+                "moves": self.captures.count,
+                "captured": self.captures.sum,
+                "buckets": [[_bound(bound), count] for (bound, count)
+                            in self.captures.cumulative()]}
+        return {"enabled": self.enabled, "functions": functions,
+                "captures": captures}
+
+    def prometheus(self):
+        "Returns the metrics in the Prometheus text exposition format"
+        lines = prometheusGauge("instrumentation_enabled",
+                                "Whether instrumentation is enabled",
+                                int(self.enabled)).splitlines()
+        name = PREFIX + "call_duration_seconds"
+        lines.append("# HELP %s Latency of instrumented calls" % name)
+        lines.append("# TYPE %s histogram" % name)
+        with self._lock:
+            for (function, histogram) in sorted(self.latencies.items()):
+                labels = 'function="%s"' % function
+                lines.extend(_histogramLines(name, labels, histogram))
+            name = PREFIX + "captures_per_move"
+            lines.append("# HELP %s Pawns captured per executed move" % name)
+            lines.append("# TYPE %s histogram" % name)
+            lines.extend(_histogramLines(name, None, self.captures))
+        return "\n".join(lines) + "\n"
+
+    def report(self):
+        "Returns a summary of the metrics, one line per function"
+        metrics = self.snapshot()
+        lines = ["%-20s %10s %12s %10s" %
+                 ("function", "calls", "total (ms)", "mean (us)")]
+        for (name, function) in metrics["functions"].items():
+            lines.append("%-20s %10d %12.1f %10.2f" %
+                         (name, function["calls"], function["seconds"] * 1e3,
+                          function["meanSeconds"] * 1e6))
+        captures = metrics["captures"]
+        lines.append("%d pawns captured in %d moves" %
+                     (captures["captured"], captures["moves"]))
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return ("Instrumentation(enabled=%r, functions=%r)" %
+                (self.enabled, sorted(self.latencies)))
+
+
+def _bound(bound):
+    return "+Inf" if bound == float("inf") else bound
+
+
+def _histogramLines(name, labels, histogram):
+    prefix = labels + "," if labels else ""
+    for (bound, count) in histogram.cumulative():
+        yield '%s_bucket{%sle="%s"} %d' % (name, prefix, _bound(bound), count)
+    suffix = "{%s}" % labels if labels else ""
+    yield "%s_sum%s %r" % (name, suffix, histogram.sum)
+    yield "%s_count%s %d" % (name, suffix, histogram.count)
+
+
+def prometheusGauge(name, description, value):
+    "Returns a gauge in the Prometheus text format, name being prefixed"
+    name = PREFIX + name
+    return ("# HELP %s %s\n# TYPE %s gauge\n%s %r\n" %
+            (name, description, name, name, value))
+
+
+instrumentation = Instrumentation()
@@ -0,0 +1,330 @@
+import json
+import platform
+import random
+import sys
+import time
+from enum import Enum
+from .game.bitboard import BitboardGame, BitboardTables
+from .game.game import Game, GameStatus
+from .game.player import Player
+from .game.tables import BoardTables
+from .game.zobrist import ZobristKeys
+
+WON = (GameStatus.ATTACKER_WON, GameStatus.DEFENDER_WON)
+
+
+class GameEngine:
+    """Perft engine playing on Game (cells and pawns),
+    through legalMoves(), execute() and undo()."""
+
+    name = "game"
+
+    def setUp(self, position, attackingPlayer, defendingPlayer,
+              attacking=True):
+        """Returns the engine state for a BitboardGame position
+        with the attacker (or the defender) to move"""
+        return BitboardGame.fromPosition(position, attackingPlayer,
+                                         defendingPlayer, attacking).toGame()
+
+    def moves(self, game, attacking):
+        player = game.attackingPlayer if attacking else game.defendingPlayer
+        return list(game.legalMoves(player))
+
+    def play(self, game, move):
+        "Plays the move, returns (new state, number of captured pawns)"
+        return (game, len(game.execute(move).captured))
+
+    def unplay(self, game, child):
+        game.undo()
+
+    def clearCache(self, game):
+        "Forgets the cached legal moves, for timing move generation"
+        game._legalMoves = {}
+
+    def captures(self, game, move):
+        "Returns the number of pawns the move would capture"
+        move.endCell.placePawn(move.startCell.takePawn())
+        killer = move.endCell.pawn
+        (row, col) = move.endCell.position
+        count = 0
+        for ((r, c), _) in game.tables.sandwiches[row][col]:
+            victim = game.cells[r][c].pawn
+            if(victim is not None and game.isTakenBy(victim, killer)):
+                count += 1
+        move.startCell.placePawn(move.endCell.takePawn())
+        return count
+
+    def status(self, game, attacking):
+        "Returns the status, the game knowing the side to move itself"
+        return game.getStatus()
+
+
+class BitboardEngine:
+    """Perft engine playing on BitboardGame, through moves(), copy()
+    and play()."""
+
+    name = "bitboard"
+
+    def setUp(self, position, attackingPlayer, defendingPlayer,
+              attacking=True):
+        return BitboardGame.fromPosition(position, attackingPlayer,
+                                         defendingPlayer, attacking)
+
+    def moves(self, bb, attacking):
+        return bb.moves(attacking)
+
+    def play(self, bb, move):
+        child = bb.copy()
+        captured = child.play(*move)
+        return (child, bin(captured).count("1"))
+
+    def unplay(self, bb, child):
+        pass
+
+    def clearCache(self, bb):
+        pass
+
+    def captures(self, bb, move):
+        return bin(bb.copy().play(*move)).count("1")
+
+    def status(self, bb, attacking):
+        return bb.getStatus(attacking)
+
+
+ENGINES = [GameEngine(), BitboardEngine()]
+
+
+def perft(engine, state, attacking, depth, counts=None):
+    """Counts the leaf nodes of the game tree of the given depth, from the
+    state with the attacker (or the defender) to move.
+
+    Won positions are not expanded. Draws by repetition are ignored so
+    that engines with and without repetition detection can be compared.
+    Returns a dict with the number of leaf nodes and, over the moves leading
+    to them, the captured pawns and the wins of each side."""
+    if(counts is None):
+        counts = {"nodes": 0, "captures": 0, "attackerWins": 0,
+                  "defenderWins": 0}
+    for move in engine.moves(state, attacking):
+        (child, captured) = engine.play(state, move)
+        if(depth == 1):
+            counts["nodes"] += 1
+            counts["captures"] += captured
+            status = engine.status(child, not attacking)
+            if(status == GameStatus.ATTACKER_WON):
+                counts["attackerWins"] += 1
+            elif(status == GameStatus.DEFENDER_WON):
+                counts["defenderWins"] += 1
+        elif(engine.status(child, not attacking) not in WON):
+            perft(engine, child, not attacking, depth - 1, counts)
+        engine.unplay(state, child)
+    return counts
+
+
+def midgamePositions(count, plies=20, size=11, seed=0):
+    """Returns count (position, attacking) pairs reached by random play
+    from the starting position, after plies moves or fewer, where position
+    is a BitboardGame position and attacking tells who is to move.
+    The corpus only depends on the arguments."""
+    rng = random.Random(seed)
+    start = BitboardGame.fromGame(Game(Player("attacker"),
+                                       Player("defender"), size))
+    positions = []
+    while(len(positions) < count):
+        bb = start.copy()
+        attacking = True
+        for _ in range(rng.randrange(1, plies + 1)):
+            bb.play(*rng.choice(bb.moves(attacking)))
+            attacking = not attacking
+            if(bb.getStatus(attacking) in WON):
+                break
+        if(bb.getStatus(attacking) not in WON):
+            positions.append((bb.position(), attacking))
+    return positions
+
+
+def _rate(operations, seconds):
+    return operations / seconds if seconds else 0.0
+
+
+def benchmarkOperations(engine, positions, attackingPlayer, defendingPlayer,
+                        repeat=3):
+    """Times move generation, execute (play and take back), capture
+    detection and getStatus over the positions with the given engine.
+    Returns a dict mapping each operation to its count and rate per second
+    (best of repeat runs)."""
+    states = [(engine.setUp(position, attackingPlayer, defendingPlayer,
+                            attacking), attacking)
+              for (position, attacking) in positions]
+    best = {}
+
+    def measure(name, function):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            operations = function()
+            seconds = time.perf_counter() - start
+            rate = _rate(operations, seconds)
+            if(name not in best or rate > best[name]["perSecond"]):
+                best[name] = {"operations": operations, "perSecond": rate}
+
+    def generate():
+        operations = 0
+        for (state, attacking) in states:
+            engine.clearCache(state)
+            operations += len(engine.moves(state, attacking))
+        return operations
+
+    moves = [(state, engine.moves(state, attacking))
+             for (state, attacking) in states]
+
+    def execute():
+        operations = 0
+        for (state, stateMoves) in moves:
+            for move in stateMoves:
+                (child, _) = engine.play(state, move)
+                engine.unplay(state, child)
+                operations += 1
+        return operations
+
+    def captures():
+        operations = 0
+        for (state, stateMoves) in moves:
+            for move in stateMoves:
+                engine.captures(state, move)
+                operations += 1
+        return operations
+
+    def status():
+        for (state, attacking) in states:
+            for _ in range(100):
+                engine.status(state, attacking)
+        return 100 * len(states)
+
+    measure("moveGeneration", generate)
+    measure("execute", execute)
+    measure("captureDetection", captures)
+    measure("getStatus", status)
+    return best
+
+
+def runSuite(size=11, depth=2, corpusSize=20, corpusPlies=20,
+             corpusDepth=1, seed=0, engines=None):
+    """Runs perft from the starting position (set up by Game.populate) to
+    the given depth and from each position of a random mid-game corpus to
+    corpusDepth, benchmarks the basic operations and measures the memory
+    footprint of a game in the starting position, for each engine.
+
+    Returns a JSON serializable dict of results. Node counts are checked
+    across engines: "mismatches" lists the disagreements, which mean that
+    an engine does not implement the rules like the others."""
+    engines = engines if engines is not None else ENGINES
+    attacker = Player("attacker")
+    defender = Player("defender")
+    start = BitboardGame.fromGame(Game(attacker, defender, size)).position()
+    corpus = midgamePositions(corpusSize, corpusPlies, size, seed)
+    results = {"size": size, "depth": depth, "corpusSize": corpusSize,
+               "corpusPlies": corpusPlies, "corpusDepth": corpusDepth,
+               "seed": seed, "python": platform.python_version(),
+               "engines": {}}
+    for engine in engines:
+        runs = {}
+        for d in range(1, depth + 1):
+            state = engine.setUp(start, attacker, defender)
+            began = time.perf_counter()
+            counts = perft(engine, state, True, d)
+            seconds = time.perf_counter() - began
+            counts["seconds"] = seconds
+            counts["nodesPerSecond"] = _rate(counts["nodes"], seconds)
+            runs[str(d)] = counts
+        corpusCounts = []
+        began = time.perf_counter()
+        for (position, attacking) in corpus:
+            state = engine.setUp(position, attacker, defender, attacking)
+            corpusCounts.append(perft(engine, state, attacking,
+                                      corpusDepth)["nodes"])
+        seconds = time.perf_counter() - began
+        results["engines"][engine.name] = {
+            "perft": runs,
+            "corpus": {"nodes": corpusCounts, "seconds": seconds,
+                       "nodesPerSecond": _rate(sum(corpusCounts), seconds)},
+            "operations": benchmarkOperations(engine, corpus, attacker,
+                                              defender),
+            "footprint": gameFootprint(engine.setUp(start, attacker,
+                                                    defender))}
+    results["mismatches"] = compareResults(results, results)
+    return results
+
+
+def _nodeCounts(results):
+    "Returns {(engine, test): counts} for the node counts of the results"
+    counts = {}
+    for (name, engine) in results["engines"].items():
+        for (depth, run) in engine["perft"].items():
+            counts[(name, "perft " + depth)] = (
+                run["nodes"], run["captures"], run["attackerWins"],
+                run["defenderWins"])
+        counts[(name, "corpus")] = tuple(engine["corpus"]["nodes"])
+    return counts
+
+
+def compareResults(results, reference):
+    """Compares the node counts of results with those of reference results
+    (for instance saved by a previous release) run with the same settings.
+    Every engine is compared with every reference engine.
+    Returns a list of strings describing the differences."""
+    mismatches = []
+    seen = set()
+    current = _nodeCounts(results)
+    expected = _nodeCounts(reference)
+    for ((name, test), counts) in sorted(current.items()):
+        for ((refName, refTest), refCounts) in sorted(expected.items()):
+            pair = (test, min(name, refName), max(name, refName))
+            if(refTest == test and counts != refCounts and pair not in seen):
+                seen.add(pair)
+                mismatches.append("%s and %s disagree on %s" %
+                                  (name, refName, test))
+    return mismatches
+
+
+def writeResults(results, stream):
+    "Writes results as JSON"
+    json.dump(results, stream, indent=2, sort_keys=True)
+
+
+def _walk(obj, seen):
+    "Returns the size of obj and of the objects it refers to, not yet seen"
+    total = 0
+    stack = [obj]
+    while(stack):
+        obj = stack.pop()
+        if(id(obj) in seen or isinstance(obj, (type, Enum))):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if(isinstance(obj, dict)):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif(isinstance(obj, (list, tuple, set, frozenset))):
+            stack.extend(obj)
+        else:
+            if(hasattr(obj, "__dict__")):
+                stack.append(obj.__dict__)
+            for cls in type(obj).__mro__:
+                for name in cls.__dict__.get("__slots__", ()):
+                    if(hasattr(obj, name)):
+                        stack.append(getattr(obj, name))
+    return total
+
+
+def gameFootprint(game):
+    """Returns the number of bytes used by a game (Game or BitboardGame):
+    the game object and everything it refers to, except the objects shared
+    with other games (board tables, Zobrist keys, players)."""
+    seen = set()
+    shared = [game.attackingPlayer, game.defendingPlayer]
+    shared.append(BoardTables.forSize(game.width))
+    shared.append(BitboardTables.forSize(game.width))
+    shared.append(ZobristKeys.forSize(game.width))
+    for obj in shared:
+        _walk(obj, seen)
+    return _walk(game, seen)
@@ -0,0 +1,117 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from .game.game import Game
+from .text_app.controller import Controller
+
+
+class HeadlessController(Controller):
+    """Controller playing a game between two computer players,
+    without reading input or printing anything.
+
+    Views can still be registered but none are by default.
+    The game stops when it is over (a player who cannot move has lost,
+    see Game.getStatus) or after maxMoves moves, the status being then
+    still IN_PROGRESS.
+
+    start() returns the result of the game as a dict (see result()).
+    """
+
+    def __init__(self, p1, p2, gameClass=Game, maxMoves=500):
+        super().__init__(gameClass, p1, p2)
+        self.maxMoves = maxMoves
+        self.moveCount = 0
+        self.attackerCaptures = 0
+        self.defenderCaptures = 0
+
+    def start(self):
+        players = (self.p1, self.p2)
+        self._updateViews()
+        while(not self.game.isOver() and self.moveCount < self.maxMoves):
+            move = players[self.moveCount % 2].chooseMove(self.game)
+            record = self.game.execute(move)
+            if(self.moveCount % 2):
+                self.defenderCaptures += len(record.captured)
+            else:
+                self.attackerCaptures += len(record.captured)
+            self.moveCount += 1
+            self._updateViews()
+        return self.result()
+
+    def result(self):
+        """Returns a dict with the status of the game, its length in moves
+        and the number of pawns captured by each side."""
+        return {"status": self.game.getStatus().name,
+                "length": self.moveCount,
+                "attackerCaptures": self.attackerCaptures,
+                "defenderCaptures": self.defenderCaptures}
+
+    def __repr__(self):
+        return ("HeadlessController(p1=%r, p2=%r, game=%r)" %
+                (self.p1, self.p2, self.game))
+
+
+def playGame(attackerPolicy, defenderPolicy, gameClass=Game, maxMoves=500):
+    """Plays one headless game and returns its result (see
+    HeadlessController.result), with the time it took in seconds.
+
+    Policies are tuples (playerClass, kwargs) used to build the computer
+    players, so that they can be sent to worker processes."""
+    (attackerClass, attackerArgs) = attackerPolicy
+    (defenderClass, defenderArgs) = defenderPolicy
+    p1 = attackerClass("Attacker", **attackerArgs)
+    p2 = defenderClass("Defender", **defenderArgs)
+    controller = HeadlessController(p1, p2, gameClass, maxMoves)
+    start = time.monotonic()
+    result = controller.start()
+    result["seconds"] = time.monotonic() - start
+    return result
+
+
+def selfPlay(games, attackerPolicy, defenderPolicy, stream,
+             workers=None, gameClass=Game, maxMoves=500):
+    """Plays the given number of games between the two policies
+    (see playGame), spread over worker processes.
+
+    Results are written to stream as JSON lines as soon as each game ends,
+    in completion order, with the index of the game under "game".
+    With workers=1 the games are played in the calling process.
+
+    Returns a summary dict with the number of games and moves, the elapsed
+    time, the throughput in games and moves per second, and the number
+    of games per final status."""
+    summary = {"games": 0, "moves": 0, "statuses": {}}
+    start = time.monotonic()
+
+    def record(index, result):
+        result["game"] = index
+        stream.write(json.dumps(result) + "\n")
+        summary["games"] += 1
+        summary["moves"] += result["length"]
+        statuses = summary["statuses"]
+        statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+
+    args = (attackerPolicy, defenderPolicy, gameClass, maxMoves)
+    if(workers == 1):
+        for index in range(games):
+            record(index, playGame(*args))
+    else:
+        workers = workers if workers is not None else os.cpu_count()
+        with ProcessPoolExecutor(workers) as executor:
+            window = 4 * workers
+            pending = {}
+            index = 0
+            while(index < games or pending):
+                while(index < games and len(pending) < window):
+                    pending[executor.submit(playGame, *args)] = index
+                    index += 1
+                (done, _) = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    record(pending.pop(future), future.result())
+
+    elapsed = time.monotonic() - start
+    summary["seconds"] = elapsed
+    summary["gamesPerSecond"] = summary["games"] / elapsed if elapsed else 0.0
+    summary["movesPerSecond"] = summary["moves"] / elapsed if elapsed else 0.0
+    return summary
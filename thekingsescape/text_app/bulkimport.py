@@ -0,0 +1,168 @@
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from ..game.game import Game
+from ..game.move import Legality, Move
+from ..game.player import Player
+
+# One alternative per token: a move, separators, a comment, or anything
+# else (a parse error). Every character is matched, in a single pass.
+_TOKEN = re.compile(r"([A-Za-z])(\d+)[ \t]*[Tt][Oo][ \t]*([A-Za-z])(\d+)"
+                    r"|[\s,;]+"
+                    r"|#[^\n]*"
+                    r"|(\S+)")
+
+
+def readGames(stream):
+    """Yields (lineNumber, text) for each game of a text log, lineNumber
+    being the line the game starts on (from 1).
+
+    Games are separated by blank lines. Each game holds moves in the
+    notation of MoveFactory ('A4 to B12'), the attacker playing first,
+    separated by newlines, commas or semicolons. '#' starts a comment up
+    to the end of the line. The stream is read line by line."""
+    lines = []
+    start = None
+    for (number, line) in enumerate(stream, 1):
+        if(line.strip()):
+            if(start is None):
+                start = number
+            lines.append(line)
+        elif(lines):
+            yield (start, "".join(lines))
+            lines = []
+            start = None
+    if(lines):
+        yield (start, "".join(lines))
+
+
+def parseMoves(text):
+    """Parses the moves of a game in a single pass over its text.
+    Returns (moves, offsets, error) where moves are ((row, col), (row, col))
+    tuples, offsets their positions in the text, and error None or the
+    (offset, token) of the first token which is not a move."""
+    moves = []
+    offsets = []
+    for match in _TOKEN.finditer(text):
+        (startCol, startRow, endCol, endRow, other) = match.groups()
+        if(startCol is not None):
+            moves.append(((int(startRow), ord(startCol.upper()) - 64),
+                          (int(endRow), ord(endCol.upper()) - 64)))
+            offsets.append(match.start())
+        elif(other is not None):
+            return (moves, offsets, (match.start(), other))
+    return (moves, offsets, None)
+
+
+def moveString(move):
+    "Returns the notation of a ((row, col), (row, col)) move"
+    ((r1, c1), (r2, c2)) = move
+    return "%s%d to %s%d" % (chr(c1 + 64), r1, chr(c2 + 64), r2)
+
+
+def verifyGame(lineNumber, text, size=11):
+    """Parses a game and replays it through execute() to check that every
+    move is legal. Returns a dict with the line the game starts on, the
+    number of moves played, the final status and the first error, if any:
+    a dict with the ply, line, move and reason."""
+    (moves, offsets, parseError) = parseMoves(text)
+    attacker = Player("Attacker")
+    defender = Player("Defender")
+    game = Game(attacker, defender, size)
+    players = (attacker, defender)
+    error = None
+    limit = size + 2
+    for (ply, ((start, end), offset)) in enumerate(zip(moves, offsets)):
+        reason = None
+        if(game.isOver()):
+            reason = "Game is over"
+        elif(not all(0 <= i < limit for i in start + end)):
+            reason = "Incorrect cell definition"
+        else:
+            move = Move(game.getCell(*start), game.getCell(*end), game,
+                        players[ply % 2])
+            legality = move.validate()
+            if(legality is Legality.LEGAL):
+                game.execute(move)
+            else:
+                reason = move.describe(legality)
+        if(reason is not None):
+            error = {"ply": ply, "move": moveString((start, end)),
+                     "line": lineNumber + text.count("\n", 0, offset),
+                     "reason": reason}
+            break
+    if(error is None and parseError is not None):
+        (offset, token) = parseError
+        error = {"ply": len(moves), "move": None,
+                 "line": lineNumber + text.count("\n", 0, offset),
+                 "reason": "Could not parse: " + token}
+    return {"line": lineNumber, "moves": len(game.history),
+            "status": game.getStatus().name, "error": error}
+
+
+def verifyGames(games, size=11):
+    """Verifies a batch of (index, lineNumber, text) games (see verifyGame),
+    returns the list of (index, result). Used by worker processes,
+    batches amortizing the cost of inter-process communication."""
+    return [(index, verifyGame(lineNumber, text, size))
+            for (index, lineNumber, text) in games]
+
+
+def _batches(stream, batchSize):
+    batch = []
+    for (index, (lineNumber, text)) in enumerate(readGames(stream)):
+        batch.append((index, lineNumber, text))
+        if(len(batch) == batchSize):
+            yield batch
+            batch = []
+    if(batch):
+        yield batch
+
+
+def importGames(stream, output, workers=None, size=11, batchSize=64):
+    """Reads a text log of games (see readGames) and verifies each game
+    (see verifyGame), whole games being spread over worker processes by
+    batches. The log is streamed, at most a few batches per worker being
+    in flight. With workers=1 games are verified in the calling process.
+
+    Results are written to output as JSON lines in completion order, with
+    the index of the game (from 0) under "game".
+    Returns a summary dict with the number of games, moves and games with
+    an error, the elapsed time and the throughput in games per second."""
+    summary = {"games": 0, "moves": 0, "errors": 0}
+    start = time.monotonic()
+
+    def record(results):
+        for (index, result) in results:
+            result["game"] = index
+            output.write(json.dumps(result) + "\n")
+            summary["games"] += 1
+            summary["moves"] += result["moves"]
+            if(result["error"] is not None):
+                summary["errors"] += 1
+
+    batches = _batches(stream, batchSize)
+    if(workers == 1):
+        for batch in batches:
+            record(verifyGames(batch, size))
+    else:
+        workers = workers if workers is not None else os.cpu_count()
+        with ProcessPoolExecutor(workers) as executor:
+            window = 2 * workers
+            pending = set()
+            for batch in batches:
+                pending.add(executor.submit(verifyGames, batch, size))
+                if(len(pending) >= window):
+                    (done, pending) = wait(pending,
+                                           return_when=FIRST_COMPLETED)
+                    for future in done:
+                        record(future.result())
+            for future in pending:
+                record(future.result())
+
+    elapsed = time.monotonic() - start
+    summary["seconds"] = elapsed
+    summary["gamesPerSecond"] = summary["games"] / elapsed if elapsed else 0.0
+    return summary
@@ -1,5 +1,5 @@
 from ..game.game import Game
-from ..game.player import Player
+from ..game.player import Player, ComputerPlayer
 from ..game.move import IllegalMoveException
 from .movefactory import MoveFactory
 
@@ -15,14 +15,22 @@ class Controller:
 
     - registerView(view) : registers the given view as an observer of the game.
     The render() method of all registered views is executed after each
-    game update.
+    game update, with the positions of the cells changed by the last move.
+
+    The game engine defaults to Game. BitboardGame can be given as
+    gameClass, with human players or computer players which only use
+    legalMoves() (such as RandomPlayer): it has no history, undo() or
+    hash, which AlphaBetaPlayer, GameSession and GameRecord.fromGame
+    need, so these require Game.
+    Players p1 (attacking) and p2 (defending) default to human players;
+    ComputerPlayer instances can be given instead.
     """
 
-    def __init__(self):
-        self.p1 = Player("Player 1")
-        self.p2 = Player("Player 2")
-        self.game = Game(attackingPlayer=self.p1,
-                         defendingPlayer=self.p2)
+    def __init__(self, gameClass=Game, p1=None, p2=None):
+        self.p1 = p1 if p1 is not None else Player("Player 1")
+        self.p2 = p2 if p2 is not None else Player("Player 2")
+        self.game = gameClass(attackingPlayer=self.p1,
+                              defendingPlayer=self.p2)
         self.views = []
 
     def registerView(self, view):
@@ -32,10 +40,12 @@ class Controller:
         game update."""
         self.views.append(view)
 
-    def _updateViews(self):
-        """Calls the render() method of all registered views."""
+    def _updateViews(self, changes=None):
+        """Calls the render() method of all registered views,
+        with the set of positions changed since the last update
+        (None for a full rendering)."""
         for view in self.views:
-            view.render(self.game)
+            view.render(self.game, changes)
 
     def start(self):
         """Starts the game.
@@ -53,22 +63,29 @@ class TextController(Controller):
 
     This controller will typically be used with a TextView,
     which should be registered via method registerView()
+
+    Turns of computer players are played without reading input.
     """
 
-    def __init__(self, stream):
-        super().__init__()
+    def __init__(self, stream, gameClass=Game, p1=None, p2=None):
+        super().__init__(gameClass, p1, p2)
         self.stream = stream
         self.moveFactory = MoveFactory(self.game)
 
     def _turn(self, player):
+        "Plays the turn of the player, returns the MoveRecord"
         print("It is " + str(player.name) + " s turn to play!")
+        if(isinstance(player, ComputerPlayer)):
+            move = player.chooseMove(self.game)
+            print(str(player.name) + " plays " + str(move))
+            return self.game.execute(move)
         print("Write your move and press Enter:")
         validInput = False
         while(not validInput):
             moveStr = input()
             try:
                 move = self.moveFactory.buildMoveFromString(moveStr, player)
-                self.game.execute(move)
+                record = self.game.execute(move)
                 validInput = True
             except ValueError:
                 print("Could not parse move.")
@@ -76,6 +93,7 @@ class TextController(Controller):
             except IllegalMoveException as e:
                 print("Move not legal: " + str(e))
                 print("Please enter a legal move:")
+        return record
 
     def start(self):
         players = (self.p1, self.p2)
@@ -83,8 +101,8 @@ class TextController(Controller):
         self._updateViews()
         while(not self.game.isOver()):
             nextPlayer = players[turnCount % 2]
-            self._turn(nextPlayer)
-            self._updateViews()
+            record = self._turn(nextPlayer)
+            self._updateViews(record.changedPositions())
             turnCount = turnCount + 1
         print(self.game.getStatus())
 
@@ -9,7 +9,7 @@ class MoveFactory:
     Regex are used to extract the cell from strings of the form
     '<Letter><Number> to <Letter><Number>'
 
-    Useful public method is buildMoveFromString()
+    Useful public methods are buildMoveFromString() and buildMove()
 
     This class is used by the TextController class.
     """
@@ -54,5 +54,12 @@ class MoveFactory:
         cells = self._extractCells(moveStr)
         return Move(cells[0], cells[1], self.game, player)
 
+    def buildMove(self, startStr, endStr, player):
+        """ Returns a Move from two cell strings (e.g. 'A4' and 'B12')
+        and a player"""
+
+        return Move(self._str2cell(startStr), self._str2cell(endStr),
+                    self.game, player)
+
     def __repr__(self):
         return "MoveFactory(game=%r)" % self.game
@@ -1,5 +1,7 @@
 import string
 
+ESC = '\x1b['
+
 
 class AbstractView:
     """Abstract base class for views
@@ -8,38 +10,79 @@ class AbstractView:
     A view should be registered with the game controller:
     controller.registerView(myView)
 
-    The main method to implement is render(self, game).
+    The main method to implement is render(self, game, changes=None).
+    After a move, controllers give the set of (row, col) positions of the
+    cells it changed (see MoveRecord.changedPositions) as changes, so that
+    views can update these cells only; changes is None when the whole
+    game should be rendered.
     """
 
     def __init__(self):
-        pass
+        self._glimpseRows = None
+        self._glimpseGame = None
 
-    def render(self, game):
+    def render(self, game, changes=None):
         raise NotImplementedError("AbstractView should not be instantiated")
 
-    def glimpse(self, game):
+    def glimpse(self, game, changes=None):
+        """Returns the board as lines of cell symbols. Lines are cached,
+        only the rows of the changed positions being rebuilt."""
         def row2str(row):
             return ''.join([cell.glimpse() for cell in row])
 
-        body = '\n'.join([row2str(row) for row in game.cells])
-        return body
+        if(changes is None or self._glimpseGame is not game):
+            self._glimpseGame = game
+            self._glimpseRows = [row2str(row) for row in game.cells]
+        else:
+            for row in set(r for (r, _) in changes):
+                self._glimpseRows[row] = row2str(game.cells[row])
+        return '\n'.join(self._glimpseRows)
 
 
 class TextView(AbstractView):
-    """ Concrete implementation of a textual view."""
+    """ Concrete implementation of a textual view.
+
+    Rendered rows are cached, and only the rows of the changed cells are
+    rebuilt and written after a move. The whole board is only printed on
+    the first render or without changes, later renders printing the
+    changed rows (with their row numbers).
+    With ansi=True (the default if the stream is a terminal), the board
+    is drawn once at the top of the screen, above a scrolling region for
+    the rest of the output, and later renders only rewrite the changed
+    lines in place with cursor-addressing escape codes.
+    """
 
-    def __init__(self, stream):
+    def __init__(self, stream, ansi=None):
+        super().__init__()
         self.stream = stream
-
-    def _toString(self, game):
-        def row2str(row, i):
-            if(i in [0, game.width + 1]):
-                numstr = 2 * ' '
-            else:
-                numstr = str(i).ljust(2)
-            rowstr = ''.join([cell.render() for cell in row])
-            return numstr + rowstr + '|'
-
+        if(ansi is None):
+            ansi = hasattr(stream, 'isatty') and stream.isatty()
+        self.ansi = ansi
+        self._rows = None
+        self._game = None
+
+    def _row2str(self, game, i):
+        if(i in [0, game.width + 1]):
+            numstr = 2 * ' '
+        else:
+            numstr = str(i).ljust(2)
+        rowstr = ''.join([cell.render() for cell in game.cells[i]])
+        return numstr + rowstr + '|'
+
+    def _updateRows(self, game, changes):
+        """Rebuilds the cached rows of the changed positions, or all rows.
+        Returns the indices of the rebuilt rows."""
+        if(changes is None or self._game is not game):
+            self._game = game
+            self._rows = [self._row2str(game, i)
+                          for i in range(len(game.cells))]
+            return None
+        touched = sorted(set(row for (row, _) in changes))
+        for i in touched:
+            self._rows[i] = self._row2str(game, i)
+        return touched
+
+    def _toString(self, game, changes=None):
         # toprow = ''.join(
         #    [str(i).ljust(2) + '  ' for i in range(1, game.width + 1)])
         # toprow = 4 * ' ' + numrow + ' '
@@ -48,15 +91,40 @@ class TextView(AbstractView):
         toprow = toprow[:game.width]
         toprow = 4 * ' ' + '   '.join(toprow)
 
-        body = '\n'.join(
-            [row2str(game.cells[i], i)
-             for i in range(len(game.cells))])
+        self._updateRows(game, changes)
+        body = '\n'.join(self._rows)
         return toprow + '\n' + body
 
-    def render(self, game):
-        """Prints a text rendering of the current state
-        of the game to the stream provided."""
-        print(self._toString(game))
-
-    def __repr___(self):
-        return "TextView(game=%r, stream=%r)" % (self.game, self.stream)
+    def _ansiUpdate(self, game, changes):
+        """Returns the escape sequence rewriting the changed lines in place,
+        or drawing the board and setting the scrolling region below it."""
+        fresh = self._game is not game
+        touched = self._updateRows(game, changes)
+        if(fresh or touched is None):
+            board = self._toString(game, ())
+            height = len(self._rows) + 2
+            return (ESC + '2J' + ESC + 'H' + board + '\n' +
+                    ESC + '%d;r' % height + ESC + '%d;1H' % height)
+        # the column letters are on line 1, row i of the board on line i + 2
+        lines = [ESC + '%d;1H' % (i + 2) + self._rows[i] + ESC + 'K'
+                 for i in touched]
+        return '\x1b7' + ''.join(lines) + '\x1b8'
+
+    def render(self, game, changes=None):
+        """Prints a text rendering of the current state of the game to
+        the stream provided: the whole board, or only the changed rows
+        after a move (see AbstractView). In ansi mode, the changed lines
+        are rewritten in place."""
+        if(self.ansi):
+            self.stream.write(self._ansiUpdate(game, changes))
+            self.stream.flush()
+            return
+        fresh = self._game is not game
+        touched = self._updateRows(game, changes)
+        if(fresh or touched is None):
+            print(self._toString(game, ()), file=self.stream)
+        else:
+            print('\n'.join(self._rows[i] for i in touched), file=self.stream)
+
+    def __repr__(self):
+        return "TextView(stream=%r, ansi=%r)" % (self.stream, self.ansi)
@@ -1,7 +1,17 @@
-from bottle import Bottle, template
+from bottle import Bottle, request, response
+from ..game.move import IllegalMoveException
+from ..instrumentation import instrumentation, prometheusGauge
+from .sessions import (AuthenticationException, SessionException,
+                       SessionStore)
 
 
 app = Bottle()
+sessions = SessionStore()
+
+
+def _error(status, message):
+    response.status = status
+    return {"error": message}
 
 
 @app.route('/')
@@ -10,13 +20,68 @@ def play():
     return "play"
 
 
-@app.route('/play/move/<start>')
-def selectmove(start):
-    return template('<b>Move: {{start}} -> ?</b>!',
-                    start=start)
+@app.get('/metrics')
+def metrics():
+    "Metrics of the instrumentation and sessions, for Prometheus"
+    response.content_type = 'text/plain; version=0.0.4'
+    return (instrumentation.prometheus() +
+            prometheusGauge("games", "Games in the session store",
+                            len(sessions)) +
+            prometheusGauge("games_evicted", "Games evicted from the store",
+                            sessions.evicted))
+
+
+@app.get('/metrics/snapshot')
+def metricsSnapshot():
+    return instrumentation.snapshot()
+
+
+@app.post('/games')
+def create():
+    session = sessions.create(request.params.get('name', "Player 1"))
+    return {"id": session.id, "token": session.creatorToken,
+            "role": "attacker"}
+
+
+@app.post('/games/<gameId>/join')
+def join(gameId):
+    try:
+        session = sessions.get(gameId)
+        token = session.join(request.params.get('name', "Player 2"))
+    except SessionException as e:
+        return _error(404 if gameId not in sessions else 409, str(e))
+    return {"id": session.id, "token": token, "role": "defender"}
+
+
+@app.get('/games/<gameId>')
+def board(gameId):
+    try:
+        return sessions.get(gameId).board()
+    except SessionException as e:
+        return _error(404, str(e))
+
+
+@app.get('/games/<gameId>/html')
+def boardHtml(gameId):
+    try:
+        session = sessions.get(gameId)
+    except SessionException as e:
+        return _error(404, str(e))
+    return session.html()
 
 
-@app.route('/play/move/<start>/<end>')
-def move(start, end):
-    return template('<b>Move: {{start}} -> {{end}}</b>!',
-                    start=start, end=end)
+@app.post('/games/<gameId>/move/<start>/<end>')
+def move(gameId, start, end):
+    try:
+        session = sessions.get(gameId)
+    except SessionException as e:
+        return _error(404, str(e))
+    try:
+        session.move(request.params.get('token'), start, end)
+    except AuthenticationException as e:
+        return _error(403, str(e))
+    except SessionException as e:
+        return _error(409, str(e))
+    except IllegalMoveException as e:
+        return _error(400, "Move not legal: " + str(e))
+    return session.board()
@@ -0,0 +1,109 @@
+from ..text_app.view import AbstractView
+
+_fragments = {}
+_rowTemplates = {}
+
+
+def pawn2html(pawn):
+    "Returns the HTML of a pawn"
+    return "<div class=%s></div>" % type(pawn).__name__
+
+
+def cellFragment(cell):
+    """Returns the HTML of a cell without its position: the end of the
+    opening td tag and the content. Fragments are cached by cell type and
+    occupant type, which is all they depend on."""
+    pawnType = type(cell.pawn)
+    key = (cell.type, pawnType)
+    fragment = _fragments.get(key)
+    if(fragment is None):
+        content = "" if cell.pawn is None else pawn2html(cell.pawn)
+        fragment = " class=%s>%s" % (cell.type.name, content)
+        _fragments[key] = fragment
+    return fragment
+
+
+def rowTemplate(limit, row):
+    """Returns the template of a table row of a board of the given
+    width (walls included), with the cell positions filled in,
+    to be formatted with the tuple of the cell fragments."""
+    key = (limit, row)
+    template = _rowTemplates.get(key)
+    if(template is None):
+        cells = "".join("<td row=%d col=%d%%s</td>" % (row, col)
+                        for col in range(limit))
+        template = "<tr>" + cells + "</tr>"
+        _rowTemplates[key] = template
+    return template
+
+
+def row2html(cells, row):
+    "Returns the HTML of the given row of cells"
+    return (rowTemplate(len(cells[row]), row) %
+            tuple([cellFragment(cell) for cell in cells[row]]))
+
+
+def cell2html(cell):
+    "Returns the HTML of a cell"
+    (row, col) = cell.position
+    return "<td row=%d col=%d%s</td>" % (row, col, cellFragment(cell))
+
+
+def game2html(game):
+    "Returns the HTML table of the whole board"
+    cells = game.cells
+    return ("<table>\n%s\n</table>" %
+            "\n".join(row2html(cells, row) for row in range(len(cells))))
+
+
+class HtmlView(AbstractView):
+    """View keeping the HTML table of a game up to date.
+
+    The HTML of each row is cached. After moves, only the rows of the
+    cells they changed (start, end and captured cells, read from the game
+    history) are rendered again; the whole board is rendered on the first
+    call or when the history does not extend the one last rendered
+    (for instance after undo()).
+
+    render(game) updates the HTML, available as the html attribute.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.html = None
+        self._rows = None
+        self._game = None
+        self._rendered = 0
+        self._lastRecord = None
+
+    def render(self, game, changes=None):
+        history = game.history
+        rendered = self._rendered
+        if(self._game is not game or len(history) < rendered or
+           (rendered and history[rendered - 1] is not self._lastRecord)):
+            self._renderAll(game)
+        elif(len(history) > rendered):
+            touched = set()
+            for record in history[rendered:]:
+                touched.add(record.startCell.position[0])
+                touched.add(record.endCell.position[0])
+                touched.update(cell.position[0]
+                               for (_, cell) in record.captured)
+            for row in touched:
+                self._rows[row] = row2html(game.cells, row)
+            self._join(game)
+        return self.html
+
+    def _renderAll(self, game):
+        self._game = game
+        self._rows = [row2html(game.cells, row)
+                      for row in range(len(game.cells))]
+        self._join(game)
+
+    def _join(self, game):
+        self.html = "<table>\n%s\n</table>" % "\n".join(self._rows)
+        self._rendered = len(game.history)
+        self._lastRecord = game.history[-1] if game.history else None
+
+    def __repr__(self):
+        return "HtmlView(game=%r)" % self._game
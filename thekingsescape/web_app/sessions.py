@@ -0,0 +1,210 @@
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from ..game.game import Game
+from ..game.player import Player
+from ..text_app.movefactory import MoveFactory
+from .htmlview import HtmlView
+
+
+class SessionException(Exception):
+    """Raised for requests which cannot be served by a game session:
+    unknown game, seat already taken, wrong player token or turn."""
+    pass
+
+
+class AuthenticationException(SessionException):
+    """Raised when a request is made with an unknown player token."""
+    pass
+
+
+class GameSession:
+    """A game hosted by the web server, with its two seats.
+
+    The player creating the session takes the attacking seat, the next one
+    joining takes the defending seat. Each seat has a secret token which
+    must be given to play its moves.
+
+    Main methods:
+    - join(name) : takes the free seat, returns its token
+    - move(token, start, end) : plays a move given as cell strings ('A4')
+    - board() : JSON serializable state of the game
+    - html() : the board as an HTML table (see HtmlView)
+    - registerView(view) : registers a view (see AbstractView) whose
+    render() method is executed after each move, as with Controller
+
+    A session lock serializes join(), move(), board() and html(), which
+    may be called from several threads.
+    """
+
+    def __init__(self, sessionId, creatorName, gameClass=Game):
+        self.id = sessionId
+        self.attacker = Player(creatorName)
+        self.defender = None
+        self.game = gameClass(attackingPlayer=self.attacker,
+                              defendingPlayer=Player("?"))
+        self.tokens = {secrets.token_hex(8): self.attacker}
+        self.lastActive = time.monotonic()
+        self.views = []
+        self._factory = MoveFactory(self.game)
+        self._htmlView = HtmlView()
+        self._lock = threading.Lock()
+
+    @property
+    def creatorToken(self):
+        "Token of the attacking seat"
+        return next(iter(self.tokens))
+
+    def join(self, name):
+        """Takes the defending seat under the given name and returns its token.
+        Raises SessionException if both seats are taken."""
+        with self._lock:
+            if(self.defender is not None):
+                raise SessionException("Game %s is full" % self.id)
+            self.defender = self.game.defendingPlayer
+            self.defender.name = name
+            token = secrets.token_hex(8)
+            self.tokens[token] = self.defender
+            return token
+
+    def registerView(self, view):
+        "Registers the given view as an observer of the game"
+        self.views.append(view)
+
+    def playerToMove(self):
+        "Returns the player whose turn it is"
+        return self.game.playerToMove()
+
+    def move(self, token, start, end):
+        """Plays the move from cell start to cell end (strings such as 'A4')
+        for the seat of the given token, through Game.execute.
+        Returns the MoveRecord, after rendering the registered views.
+        Raises AuthenticationException if the token is unknown,
+        SessionException if the turn or cells are wrong, and
+        IllegalMoveException if the move is not legal."""
+        with self._lock:
+            player = self.tokens.get(token)
+            if(player is None):
+                raise AuthenticationException("Unknown player token")
+            if(self.defender is None):
+                raise SessionException("Waiting for an opponent")
+            if(self.game.isOver()):
+                raise SessionException("Game is over")
+            if(player != self.playerToMove()):
+                raise SessionException("Not your turn")
+            try:
+                move = self._factory.buildMove(start, end, player)
+            except ValueError as e:
+                raise SessionException(str(e))
+            record = self.game.execute(move)
+            changes = record.changedPositions()
+            for view in self.views:
+                view.render(self.game, changes)
+            return record
+
+    def board(self):
+        """Returns the state of the game as a JSON serializable dict:
+        the rows of the board as strings of cell symbols (see Cell.glimpse),
+        players, player to move, status and last move."""
+        with self._lock:
+            game = self.game
+            lastMove = None
+            if(game.history):
+                record = game.history[-1]
+                lastMove = {"start": record.startCell.position,
+                            "end": record.endCell.position,
+                            "captured": [cell.position
+                                         for (_, cell) in record.captured]}
+            return {"id": self.id,
+                    "size": game.width,
+                    "rows": ["".join(cell.glimpse() for cell in row)
+                             for row in game.cells],
+                    "attacker": self.attacker.name,
+                    "defender": self.defender.name if self.defender else None,
+                    "toMove": ("attacker" if self.playerToMove() ==
+                               game.attackingPlayer else "defender"),
+                    "moves": len(game.history),
+                    "status": game.getStatus().name,
+                    "lastMove": lastMove}
+
+    def html(self):
+        "Returns the board as an HTML table, re-rendering the changed rows"
+        with self._lock:
+            return self._htmlView.render(self.game)
+
+    def __repr__(self):
+        return ("GameSession(id=%r, attacker=%r, defender=%r)" %
+                (self.id, self.attacker, self.defender))
+
+
+class SessionStore:
+    """In-memory store of the live game sessions of a server.
+
+    Sessions are kept in least recently used order. Sessions idle for more
+    than idleTimeout seconds are evicted, and when more than maxGames are
+    live the least recently used ones are evicted, which bounds the memory
+    used by the server. Methods can be called from several threads.
+    """
+
+    def __init__(self, maxGames=10000, idleTimeout=3600, gameClass=Game,
+                 clock=time.monotonic):
+        self.maxGames = maxGames
+        self.idleTimeout = idleTimeout
+        self.gameClass = gameClass
+        self.clock = clock
+        self.evicted = 0
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, creatorName):
+        "Creates a new session, returns it"
+        with self._lock:
+            self._evictIdle()
+            sessionId = secrets.token_hex(6)
+            while(sessionId in self._sessions):
+                sessionId = secrets.token_hex(6)
+            session = GameSession(sessionId, creatorName, self.gameClass)
+            session.lastActive = self.clock()
+            self._sessions[sessionId] = session
+            while(len(self._sessions) > self.maxGames):
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+            return session
+
+    def get(self, sessionId):
+        """Returns the session with the given id, marking it as active.
+        Raises SessionException if there is no such live session."""
+        with self._lock:
+            self._evictIdle()
+            session = self._sessions.get(sessionId)
+            if(session is None):
+                raise SessionException("No game %s" % sessionId)
+            session.lastActive = self.clock()
+            self._sessions.move_to_end(sessionId)
+            return session
+
+    def remove(self, sessionId):
+        "Removes a session, if still live"
+        with self._lock:
+            self._sessions.pop(sessionId, None)
+
+    def _evictIdle(self):
+        "Evicts the sessions idle for too long, the oldest being first"
+        limit = self.clock() - self.idleTimeout
+        while(self._sessions):
+            (sessionId, session) = next(iter(self._sessions.items()))
+            if(session.lastActive >= limit):
+                break
+            del self._sessions[sessionId]
+            self.evicted += 1
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, sessionId):
+        return sessionId in self._sessions
+
+    def __repr__(self):
+        return ("SessionStore(maxGames=%r, idleTimeout=%r, live=%d)" %
+                (self.maxGames, self.idleTimeout, len(self._sessions)))
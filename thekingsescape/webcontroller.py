@@ -1,43 +1,46 @@
-from .game.player import Player
-from .game.game import Game
-from .web_app.app import app
+from .web_app import htmlview
+from .instrumentation import instrumentation
+from .web_app.app import app, sessions
 from bottle import run
 
 
 class WebController():
-
-    def __init__(self):
-        self.p1 = Player("Player 1")
-        self.p2 = Player("Player 2")
-        self.game = Game(attackingPlayer=self.p1,
-                         defendingPlayer=self.p2)
+    """Web server hosting any number of concurrent games.
+
+    Games live in the session store of the web app (see SessionStore),
+    created and played through its routes:
+    POST /games, POST /games/<id>/join, GET /games/<id> (JSON board) and
+    POST /games/<id>/move/<start>/<end> (with the player token)
+    and GET /games/<id>/html (the board as an HTML table).
+    GET /metrics exports the metrics of the instrumentation (see
+    Instrumentation, enabled with instrument=True) in the Prometheus text
+    format, GET /metrics/snapshot as JSON.
+    At most maxGames games are kept, evicting the least recently used ones
+    and those idle for more than idleTimeout seconds.
+    """
+
+    def __init__(self, maxGames=10000, idleTimeout=3600, host='localhost',
+                 port=8080, instrument=False):
+        self.sessions = sessions
+        self.sessions.maxGames = maxGames
+        self.sessions.idleTimeout = idleTimeout
+        self.host = host
+        self.port = port
+        self.instrument = instrument
 
     def start(self):
-        run(app, host='localhost', port=8080, debug=True)
+        if(self.instrument):
+            instrumentation.enable()
+        run(app, host=self.host, port=self.port, debug=True)
 
     @staticmethod
     def pawn2html(pawn):
-        return ("<div class=%s></div>" %
-                type(pawn).__name__)
+        return htmlview.pawn2html(pawn)
 
     @staticmethod
     def cell2html(cell):
-        pawn_html = ""
-        if(cell.isOccupied()):
-            pawn_html = WebController.cell2html(cell.pawn)
-        return ("<td class=%s, row=%s, col=%s>%s</td>" %
-                (type(cell).__name__, pawn_html,
-                 cell.position[1], cell.position[2]))
+        return htmlview.cell2html(cell)
 
     @staticmethod
     def game2html(game):
-        def row2html(row):
-            for cell in row:
-                    yield(WebController.cell2html(cell))
-
-        def body_html():
-            for row in game.cells:
-                yield "<tr>" + "".join(row2html(row)) + "</tr>"
-
-        return ("<table>\n%s\n</table>" %
-                '\n'.join(body_html()))
+        return htmlview.game2html(game)